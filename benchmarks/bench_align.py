@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Letter-phone pair counting of cummulate_pairs (lattice counting) against
+enumerating every alignment with find_all_aligns, on a generated lexicon
+with long compound words. Checks that both give the same table.
+
+Examples:
+    python benchmarks/bench_align.py
+    python benchmarks/bench_align.py --words 5000 --max-letters 16
+"""
+from __future__ import print_function, division
+
+import argparse
+import contextlib
+import copy
+import io
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+from pymimic.train_lex_lts.filter_align import (  # noqa: E402
+    cummulate_aligns, cummulate_pairs, find_all_aligns)
+
+LETTERS = 'abcdefghijklmnopqrstuvwxyz'
+PHONES = ['aa', 'ae', 'ah', 'b', 'ch', 'd', 'eh', 'f', 'g', 'hh', 'ih', 'iy',
+          'jh', 'k', 'l', 'm', 'n', 'ow', 'p', 'r', 's', 'sh', 't', 'uw', 'v',
+          'w', 'y', 'z']
+
+
+def enumerate_pairs(lexicon, allowables):
+    """ cummulate_pairs as it was, building every alignment """
+    pl_table = defaultdict(lambda: defaultdict(int))
+    for letter, phones in allowables.items():
+        for phone in phones:
+            pl_table[letter][phone] = 0
+    failed_list = []
+    for word, heteronyms in sorted(lexicon.items()):
+        for heteronym in heteronyms:
+            phones = heteronym[2]
+            all_aligns = find_all_aligns(['#'] + phones + ['#'],
+                                         ['#'] + list(word) + ['#'],
+                                         pl_table)
+            if len(all_aligns) == 0:
+                failed_list.append((word, " ".join(phones)))
+            cummulate_aligns(all_aligns, pl_table)
+    return pl_table, failed_list
+
+
+def generate(words, max_letters, seed=0):
+    rng = random.Random(seed)
+    allowables = {'#': ['#']}
+    for letter in LETTERS:
+        allowables[letter] = ['_epsilon_'] + rng.sample(PHONES, 5)
+    allowables['x'].append('k-s')
+    lexicon = {}
+    for _ in range(words):
+        word = ''.join(rng.choice(LETTERS)
+                       for _ in range(rng.randint(3, max_letters)))
+        phones = []
+        for letter in word:
+            if rng.random() < 0.3:
+                continue
+            phone = rng.choice(allowables[letter][1:])
+            phones.extend(phone.split('-'))
+        lexicon.setdefault(word, []).append(('nil', None, phones))
+    return lexicon, allowables
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument('--words', type=int, default=2000)
+    parser.add_argument('--max-letters', type=int, default=14)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    lexicon, allowables = generate(args.words, args.max_letters, args.seed)
+    results = []
+    for name, function in (('enumerate', enumerate_pairs),
+                           ('lattice', cummulate_pairs)):
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            pl_table, failed = function(lexicon, copy.deepcopy(allowables))
+        elapsed = time.perf_counter() - start
+        results.append(({letter: list(counts.items())
+                         for letter, counts in pl_table.items()}, failed))
+        print('{:>10} {:8.3f}s'.format(name, elapsed))
+    same = results[0] == results[1]
+    print('{} words, {} failed, tables {}'.format(
+        len(lexicon), len(results[1][1]), 'equal' if same else 'DIFFER'))
+    return 0 if same else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
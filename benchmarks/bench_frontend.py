@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Compare front-end only synthesis (Utterance(until='Segment')) with full
+synthesis including the waveform.
+
+Example:
+    python benchmarks/bench_frontend.py --voice cmu_us_rms.flitevox
+    python benchmarks/bench_frontend.py --fake
+"""
+from __future__ import print_function, division
+
+import argparse
+import os
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+import pymimic  # noqa: E402
+from pymimic import Speak, text_to_phonemes, voice_registry  # noqa: E402
+
+DEFAULT_TEXT = ("The quick brown fox jumps over the lazy dog. "
+                "Pack my box with five dozen liquor jugs.")
+
+
+def best_of(func, repeat, number):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = (time.perf_counter() - start) / number
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument('--voice', default='slt', help='Voice name or path')
+    parser.add_argument('--fake', action='store_true',
+                        help='Use the stand-in library from fake_mimic')
+    parser.add_argument('--fake-work', type=int, default=200)
+    parser.add_argument('--text', default=DEFAULT_TEXT)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--number', type=int, default=20)
+    args = parser.parse_args()
+
+    if args.fake:
+        import fakelib
+        os.environ['FAKE_MIMIC_WORK'] = str(args.fake_work)
+        pymimic.load(path=fakelib.build())
+    voice = voice_registry.acquire(args.voice)
+    full = best_of(lambda: Speak(args.text, voice).phonemes,
+                   args.repeat, args.number)
+    frontend = best_of(lambda: text_to_phonemes(args.text, voice),
+                       args.repeat, args.number)
+    print("full synthesis:   {:9.3f} ms".format(full * 1000))
+    print("front-end only:   {:9.3f} ms".format(frontend * 1000))
+    print("speedup:          {:9.2f}x".format(full / frontend))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Scaling of the sharded lexicon reader: seconds to load a Festival lexicon
+with read_lexicon for each number of worker processes, and to load it
+again from the binary lexicon cache.
+
+Without --lexicon a lexicon of --entries generated words is used.
+
+Examples:
+    python benchmarks/bench_lexicon.py --entries 200000 --workers 1 2 4 8
+    python benchmarks/bench_lexicon.py --lexicon cmudict.scm --stress aa ae ah
+"""
+from __future__ import print_function, division
+
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+from pymimic.train_lex_lts.common import read_lexicon  # noqa: E402
+
+CONSONANTS = ['b', 'd', 'f', 'g', 'hh', 'k', 'l', 'm', 'n', 'p', 'r', 's',
+              't', 'v', 'z']
+VOWELS = ['aa', 'ae', 'ah', 'eh', 'ih', 'iy', 'ow', 'uw']
+
+
+def generate_lexicon(filename, entries, seed=0):
+    rng = random.Random(seed)
+    with open(filename, 'w') as fd:
+        fd.write('MNCL\n')
+        for i in range(entries):
+            syls = []
+            for _ in range(rng.randint(1, 4)):
+                phones = [rng.choice(CONSONANTS), rng.choice(VOWELS)]
+                if rng.random() < 0.5:
+                    phones.append(rng.choice(CONSONANTS))
+                syls.append('(({}) {})'.format(' '.join(phones),
+                                               rng.randint(0, 2)))
+            word = ''.join(p[0] for p in phones) + str(i)
+            pos = rng.choice(['nil', 'n', 'v', 'j'])
+            fd.write('("{}" {} ({}))\n'.format(word, pos, ' '.join(syls)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument('--lexicon', help='Festival lexicon to read')
+    parser.add_argument('--entries', type=int, default=100000,
+                        help='Entries of the generated lexicon')
+    parser.add_argument('--stress', nargs='*', default=VOWELS,
+                        help='Phones the stress is appended to')
+    parser.add_argument('--workers', type=int, nargs='+',
+                        default=[1, 2, 4, os.cpu_count() or 1])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    lexicon = args.lexicon
+    cache_dir = None
+    if lexicon is None:
+        fd, lexicon = tempfile.mkstemp(suffix='.scm')
+        os.close(fd)
+        generate_lexicon(lexicon, args.entries)
+    try:
+        size_mb = os.path.getsize(lexicon) / 1e6
+        print('{:.1f} MB, {} CPUs'.format(size_mb, os.cpu_count()))
+        print('{:>8} {:>10} {:>10} {:>8}'.format('workers', 'seconds',
+                                                 'MB/s', 'speedup'))
+        baseline = None
+        for workers in sorted(set(args.workers)):
+            best = None
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                words = read_lexicon(lexicon, append_stress_to=args.stress,
+                                     workers=workers, progress=False,
+                                     cache=False)
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+            baseline = baseline or best
+            print('{:>8} {:>10.3f} {:>10.1f} {:>7.2f}x'.format(
+                workers, best, size_mb / best, baseline / best))
+        print('{} words'.format(len(words)))
+
+        cache_dir = tempfile.mkdtemp()
+        os.environ['PYMIMIC_CACHE_DIR'] = cache_dir
+        start = time.perf_counter()
+        read_lexicon(lexicon, append_stress_to=args.stress, progress=False,
+                     cache=True)
+        written = time.perf_counter() - start
+        start = time.perf_counter()
+        read_lexicon(lexicon, append_stress_to=args.stress, progress=False,
+                     cache=True)
+        cached = time.perf_counter() - start
+        print('cache: first read {:.3f}s, cached read {:.3f}s ({:.2f}x)'
+              .format(written, cached, baseline / cached))
+    finally:
+        if args.lexicon is None:
+            os.unlink(lexicon)
+        if cache_dir is not None:
+            shutil.rmtree(cache_dir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Memory per worker of SharedVoicePool, which loads voices in the parent
+before forking, against synthesize_many, which loads them in every worker.
+
+Examples:
+    python benchmarks/bench_shared_voices.py --voice cmu_us_rms.flitevox
+    python benchmarks/bench_shared_voices.py --fake --voice-mb 64
+"""
+from __future__ import print_function, division
+
+import argparse
+import multiprocessing
+import os
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+import pymimic  # noqa: E402
+from pymimic import SharedVoicePool, process_memory, synthesize_many  # noqa: E402
+
+TEXT = "The quick brown fox jumps over the lazy dog."
+MB = 1024 * 1024
+
+
+def report(name, usage):
+    print(name)
+    for pid, mem in sorted(usage.items()):
+        print("  {:>8} unique {:8.1f} MB  shared {:8.1f} MB  pss {:8.1f} MB"
+              .format(pid, mem['unique'] / MB, mem['shared'] / MB,
+                      mem['pss'] / MB))
+    print("  total pss {:.1f} MB".format(
+        sum(mem['pss'] for mem in usage.values()) / MB))
+
+
+def process_pool_usage(args):
+    texts = [TEXT] * (4 * args.workers)
+    results = synthesize_many(texts, args.voice, workers=args.workers,
+                              max_pending=len(texts))
+    next(results)
+    # The pool is this process' only child while the generator runs
+    usage = {}
+    for child in multiprocessing.active_children():
+        usage[child.pid] = process_memory(child.pid)
+    results.close()
+    return usage
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument('--voice', default='slt', help='Voice name or path')
+    parser.add_argument('--fake', action='store_true',
+                        help='Use the stand-in library from fake_mimic')
+    parser.add_argument('--voice-mb', type=int, default=64,
+                        help='Voice data size of the stand-in voices')
+    parser.add_argument('--workers', type=int, default=4)
+    args = parser.parse_args()
+
+    if args.fake:
+        import fakelib
+        os.environ['FAKE_MIMIC_VOICE_MB'] = str(args.voice_mb)
+        pymimic.load(path=fakelib.build())
+
+    report('synthesize_many (voice loaded per worker)',
+           process_pool_usage(args))
+    with SharedVoicePool([args.voice], args.workers) as pool:
+        for _ in pool.map([TEXT] * (4 * args.workers)):
+            pass
+        report('SharedVoicePool (voice shared copy-on-write)',
+               pool.memory_usage()['workers'])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Scaling of ThreadPoolSynthesizer against the process pool of
+synthesize_many: texts per second and peak RSS for each worker count.
+
+Examples:
+    python benchmarks/bench_threads.py --voice cmu_us_rms.flitevox
+    python benchmarks/bench_threads.py --fake --workers 1 2 4 8
+"""
+from __future__ import print_function, division
+
+import argparse
+import os
+import resource
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+import pymimic  # noqa: E402
+from pymimic import (ThreadPoolSynthesizer, synthesize_many,  # noqa: E402
+                     voice_registry)
+
+TEXT = ("The quick brown fox jumps over the lazy dog. "
+        "Pack my box with five dozen liquor jugs.")
+
+
+def rss_mb(who):
+    scale = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return resource.getrusage(who).ru_maxrss / scale
+
+
+def run_threads(voice, texts, workers):
+    with ThreadPoolSynthesizer(voice, workers) as synth:
+        start = time.perf_counter()
+        for _ in synth.map(texts):
+            pass
+        return time.perf_counter() - start
+
+
+def run_processes(voice_name, texts, workers):
+    start = time.perf_counter()
+    for _ in synthesize_many(texts, voice_name, workers=workers):
+        pass
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument('--voice', default='slt', help='Voice name or path')
+    parser.add_argument('--fake', action='store_true',
+                        help='Use the stand-in library from fake_mimic')
+    parser.add_argument('--fake-work', type=int, default=200)
+    parser.add_argument('--workers', type=int, nargs='+',
+                        default=[1, 2, 4, os.cpu_count() or 1])
+    parser.add_argument('--texts', type=int, default=64)
+    parser.add_argument('--processes', action='store_true',
+                        help='Also run the process pool for comparison')
+    args = parser.parse_args()
+
+    if args.fake:
+        import fakelib
+        os.environ['FAKE_MIMIC_WORK'] = str(args.fake_work)
+        pymimic.load(path=fakelib.build())
+    voice = voice_registry.acquire(args.voice)
+    texts = [TEXT] * args.texts
+
+    print("{:>8} {:>8} {:>10} {:>8} {:>10}".format(
+        'pool', 'workers', 'texts/s', 'speedup', 'rss MB'))
+    pools = [('threads', lambda n: run_threads(voice, texts, n))]
+    if args.processes:
+        pools.append(('process',
+                      lambda n: run_processes(args.voice, texts, n)))
+    for name, run in pools:
+        base = None
+        for workers in args.workers:
+            elapsed = run(workers)
+            base = base or elapsed
+            rss = rss_mb(resource.RUSAGE_SELF)
+            if name == 'process':
+                # Estimate, only the largest child is recorded
+                rss += rss_mb(resource.RUSAGE_CHILDREN) * workers
+            print("{:>8} {:>8} {:>10.1f} {:>8.2f} {:>10.1f}".format(
+                name, workers, len(texts) / elapsed, base / elapsed, rss))
+
+
+if __name__ == '__main__':
+    main()
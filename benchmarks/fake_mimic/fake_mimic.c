@@ -0,0 +1,716 @@
+/*
+ * Deterministic stand-in for libttsmimiccore.
+ *
+ * Implements the subset of the mimic-core API that pymimic binds, with
+ * struct layouts matching the ctypes declarations in pymimic/pymimic.py.
+ * Every letter of the input text becomes one "phone" segment of
+ * SEGMENT_DUR seconds, and the wave is a deterministic sawtooth, so
+ * timings and samples are reproducible across runs and machines.
+ *
+ * The environment variable FAKE_MIMIC_WORK scales a busy loop per
+ * generated sample, to emulate the CPU cost of real waveform synthesis.
+ * FAKE_MIMIC_VOICE_MB gives every loaded voice that many megabytes of
+ * voice data, which synthesis reads, to emulate the memory of real voices.
+ */
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <ctype.h>
+
+#define SAMPLE_RATE 16000
+#define SEGMENT_DUR 0.05f
+
+typedef struct val_s {
+    int type;           /* 0 int, 1 float, 2 string, 3 uttfunc */
+    int ival;
+    float fval;
+    char *sval;
+    void *fn;
+} cst_val;
+
+typedef struct featvalpair_s {
+    const char *name;
+    cst_val *val;
+    struct featvalpair_s *next;
+} cst_featvalpair;
+
+typedef struct features_s {
+    cst_featvalpair *head;
+    void *ctx;
+    cst_val *owned_strings;
+} cst_features;
+
+/* What an item is in every relation it is in, e.g. a segment in Segment
+ * and in SylStructure */
+typedef struct item_contents_s {
+    cst_features *features;
+    struct item_s *in[4];
+    int num_in;
+} cst_item_contents;
+
+typedef struct item_s {
+    cst_item_contents *contents;
+    struct relation_s *relation;
+    struct item_s *next;
+    struct item_s *prev;
+    struct item_s *parent;
+    struct item_s *daughter;
+} cst_item;
+
+typedef struct relation_s {
+    char *name;
+    cst_item *head;
+    cst_item *tail;
+    struct relation_s *next;
+} cst_relation;
+
+typedef struct utterance_s {
+    cst_features *features;
+    cst_features *ffunctions;
+    cst_features *relations;
+    void *ctx;
+    /* private to the stand-in */
+    char *text;
+    void *voice;
+    cst_relation *rels;
+    void *wave;
+} cst_utterance;
+
+typedef struct voice_s {
+    const char *name;
+    cst_features *features;
+    cst_features *ffunctions;
+    /* private to the stand-in */
+    unsigned char *data;
+    size_t data_size;
+    int deleted;
+    struct voice_s *next;
+} cst_voice;
+
+typedef struct wave_s {
+    const char *type;
+    int sample_rate;
+    int num_samples;
+    int num_channels;
+    short *samples;
+} cst_wave;
+
+typedef cst_utterance *(*cst_uttfunc)(cst_utterance *u);
+
+static long work_per_sample = -1;
+
+static long get_work(void)
+{
+    if (work_per_sample < 0) {
+        const char *w = getenv("FAKE_MIMIC_WORK");
+        work_per_sample = w ? atol(w) : 0;
+    }
+    return work_per_sample;
+}
+
+static char *xstrdup(const char *s)
+{
+    char *r = malloc(strlen(s) + 1);
+    strcpy(r, s);
+    return r;
+}
+
+void mimic_core_init(void) { get_work(); }
+
+/* features */
+cst_features *new_features(void)
+{
+    return calloc(1, sizeof(cst_features));
+}
+
+static void delete_val(cst_val *v)
+{
+    if (v == NULL)
+        return;
+    free(v->sval);
+    free(v);
+}
+
+void delete_features(cst_features *f)
+{
+    cst_featvalpair *p, *n;
+    if (f == NULL)
+        return;
+    for (p = f->head; p; p = n) {
+        n = p->next;
+        delete_val(p->val);
+        free(p);
+    }
+    free(f);
+}
+
+static cst_val *copy_val(const cst_val *v)
+{
+    cst_val *r = malloc(sizeof(cst_val));
+    *r = *v;
+    if (v->sval)
+        r->sval = xstrdup(v->sval);
+    return r;
+}
+
+void feat_set(cst_features *f, const char *name, const cst_val *v)
+{
+    cst_featvalpair *p;
+    for (p = f->head; p; p = p->next) {
+        if (strcmp(p->name, name) == 0) {
+            delete_val(p->val);
+            p->val = (cst_val *)v;
+            return;
+        }
+    }
+    /* The name is not copied, as in flite it must outlive the features */
+    p = malloc(sizeof(cst_featvalpair));
+    p->name = name;
+    p->val = (cst_val *)v;
+    p->next = f->head;
+    f->head = p;
+}
+
+void feat_set_int(cst_features *f, const char *name, int v)
+{
+    cst_val *val = calloc(1, sizeof(cst_val));
+    val->type = 0;
+    val->ival = v;
+    feat_set(f, name, val);
+}
+
+void feat_set_float(cst_features *f, const char *name, float v)
+{
+    cst_val *val = calloc(1, sizeof(cst_val));
+    val->type = 1;
+    val->fval = v;
+    feat_set(f, name, val);
+}
+
+void feat_set_string(cst_features *f, const char *name, const char *v)
+{
+    cst_val *val = calloc(1, sizeof(cst_val));
+    val->type = 2;
+    val->sval = xstrdup(v);
+    feat_set(f, name, val);
+}
+
+cst_val *uttfunc_val(cst_uttfunc fn)
+{
+    cst_val *val = calloc(1, sizeof(cst_val));
+    val->type = 3;
+    val->fn = (void *)fn;
+    return val;
+}
+
+static const cst_val *feat_val(const cst_features *f, const char *name)
+{
+    const cst_featvalpair *p;
+    if (f == NULL)
+        return NULL;
+    for (p = f->head; p; p = p->next)
+        if (strcmp(p->name, name) == 0)
+            return p->val;
+    return NULL;
+}
+
+int feat_copy_into(const cst_features *from, cst_features *to)
+{
+    const cst_featvalpair *p;
+    int n = 0;
+    for (p = from->head; p; p = p->next, n++)
+        feat_set(to, p->name, copy_val(p->val));
+    return n;
+}
+
+/* items and relations */
+static void fatal(const char *msg, const char *name)
+{
+    /* Like cst_error() in flite, which exits the process */
+    fprintf(stderr, "fake_mimic: %s %s\n", msg, name);
+    exit(-1);
+}
+
+static cst_item *new_item(cst_relation *r, cst_item *same)
+{
+    cst_item *i = calloc(1, sizeof(cst_item));
+    i->relation = r;
+    if (same == NULL) {
+        i->contents = calloc(1, sizeof(cst_item_contents));
+        i->contents->features = new_features();
+    } else {
+        i->contents = same->contents;
+    }
+    i->contents->in[i->contents->num_in++] = i;
+    return i;
+}
+
+/* Append an item to r, sharing the contents of same if given */
+static cst_item *relation_append(cst_relation *r, cst_item *same)
+{
+    cst_item *i = new_item(r, same);
+    if (r->tail) {
+        r->tail->next = i;
+        i->prev = r->tail;
+    } else {
+        r->head = i;
+    }
+    r->tail = i;
+    return i;
+}
+
+static cst_item *item_append_daughter(cst_item *parent, cst_item *same)
+{
+    cst_item *i = new_item(parent->relation, same);
+    cst_item *last = parent->daughter;
+    i->parent = parent;
+    if (last == NULL) {
+        parent->daughter = i;
+        return i;
+    }
+    while (last->next)
+        last = last->next;
+    last->next = i;
+    i->prev = last;
+    return i;
+}
+
+static void delete_items(cst_item *i)
+{
+    cst_item *n;
+    for (; i; i = n) {
+        n = i->next;
+        delete_items(i->daughter);
+        if (--i->contents->num_in == 0) {
+            delete_features(i->contents->features);
+            free(i->contents);
+        }
+        free(i);
+    }
+}
+
+static void delete_relation(cst_relation *r)
+{
+    delete_items(r->head);
+    free(r->name);
+    free(r);
+}
+
+cst_relation *utt_relation(cst_utterance *u, const char *name)
+{
+    cst_relation *r;
+    for (r = u->rels; r; r = r->next)
+        if (strcmp(r->name, name) == 0)
+            return r;
+    return NULL;
+}
+
+cst_item *relation_head(cst_relation *r)
+{
+    return r ? r->head : NULL;
+}
+
+cst_item *item_next(const cst_item *i)
+{
+    return i ? i->next : NULL;
+}
+
+static const char *val_string(const cst_val *v)
+{
+    static char buf[32];
+    if (v->type == 2)
+        return v->sval;
+    if (v->type == 1)
+        snprintf(buf, sizeof(buf), "%g", v->fval);
+    else
+        snprintf(buf, sizeof(buf), "%d", v->ival);
+    return buf;
+}
+
+static float val_float(const cst_val *v)
+{
+    if (v->type == 1)
+        return v->fval;
+    if (v->type == 0)
+        return (float)v->ival;
+    return (float)atof(v->sval);
+}
+
+static int val_int(const cst_val *v)
+{
+    if (v->type == 0)
+        return v->ival;
+    if (v->type == 1)
+        return (int)v->fval;
+    return atoi(v->sval);
+}
+
+/* The item's own features only, a missing one is fatal as in flite */
+static const cst_val *item_feat(const cst_item *i, const char *name)
+{
+    const cst_val *v = feat_val(i->contents->features, name);
+    if (v == NULL)
+        fatal("item has no feature", name);
+    return v;
+}
+
+const char *item_feat_string(const cst_item *i, const char *name)
+{
+    return val_string(item_feat(i, name));
+}
+
+float item_feat_float(const cst_item *i, const char *name)
+{
+    return val_float(item_feat(i, name));
+}
+
+int item_feat_int(const cst_item *i, const char *name)
+{
+    return val_int(item_feat(i, name));
+}
+
+/* Feature paths as in flite: n, p, nn, pp, parent, daughter(1|2|n), first,
+ * last and R:Relation steps, then the feature name. A path leading
+ * nowhere or a missing feature gives 0. */
+static const cst_val *ffeature(const cst_item *i, const char *path)
+{
+    char buf[256];
+    char *step, *dot;
+    int k;
+    if (strlen(path) >= sizeof(buf))
+        return NULL;
+    strcpy(buf, path);
+    step = buf;
+    while (i && (dot = strchr(step, '.')) != NULL) {
+        *dot = '\0';
+        if (strcmp(step, "n") == 0)
+            i = i->next;
+        else if (strcmp(step, "p") == 0)
+            i = i->prev;
+        else if (strcmp(step, "nn") == 0)
+            i = i->next ? i->next->next : NULL;
+        else if (strcmp(step, "pp") == 0)
+            i = i->prev ? i->prev->prev : NULL;
+        else if (strcmp(step, "parent") == 0)
+            i = i->parent;
+        else if (strcmp(step, "daughter") == 0 ||
+                 strcmp(step, "daughter1") == 0)
+            i = i->daughter;
+        else if (strcmp(step, "daughter2") == 0)
+            i = i->daughter ? i->daughter->next : NULL;
+        else if (strcmp(step, "daughtern") == 0) {
+            i = i->daughter;
+            while (i && i->next)
+                i = i->next;
+        } else if (strcmp(step, "first") == 0) {
+            while (i->prev)
+                i = i->prev;
+        } else if (strcmp(step, "last") == 0) {
+            while (i->next)
+                i = i->next;
+        } else if (strncmp(step, "R:", 2) == 0) {
+            const cst_item_contents *c = i->contents;
+            i = NULL;
+            for (k = 0; k < c->num_in; k++)
+                if (strcmp(c->in[k]->relation->name, step + 2) == 0)
+                    i = c->in[k];
+        } else {
+            fatal("unknown feature path step", step);
+        }
+        step = dot + 1;
+    }
+    return i ? feat_val(i->contents->features, step) : NULL;
+}
+
+const char *ffeature_string(const cst_item *i, const char *path)
+{
+    const cst_val *v = ffeature(i, path);
+    return v ? val_string(v) : "0";
+}
+
+float ffeature_float(const cst_item *i, const char *path)
+{
+    const cst_val *v = ffeature(i, path);
+    return v ? val_float(v) : 0.0f;
+}
+
+int ffeature_int(const cst_item *i, const char *path)
+{
+    const cst_val *v = ffeature(i, path);
+    return v ? val_int(v) : 0;
+}
+
+/* waves */
+cst_wave *new_wave(void)
+{
+    cst_wave *w = calloc(1, sizeof(cst_wave));
+    w->type = "riff";
+    w->num_channels = 1;
+    return w;
+}
+
+void delete_wave(cst_wave *w)
+{
+    if (w == NULL)
+        return;
+    free(w->samples);
+    free(w);
+}
+
+cst_wave *copy_wave(const cst_wave *w)
+{
+    cst_wave *r = new_wave();
+    *r = *w;
+    r->samples = malloc(sizeof(short) * w->num_samples * w->num_channels);
+    memcpy(r->samples, w->samples,
+           sizeof(short) * w->num_samples * w->num_channels);
+    return r;
+}
+
+int cst_wave_save_riff(cst_wave *w, const char *filename)
+{
+    FILE *fd = fopen(filename, "wb");
+    int data_size, n;
+    if (fd == NULL)
+        return -1;
+    data_size = w->num_samples * w->num_channels * 2;
+    fwrite("RIFF", 1, 4, fd);
+    n = 36 + data_size;
+    fwrite(&n, 4, 1, fd);
+    fwrite("WAVEfmt ", 1, 8, fd);
+    n = 16;
+    fwrite(&n, 4, 1, fd);
+    {
+        short fmt = 1, ch = w->num_channels, bits = 16, align = 2 * ch;
+        int rate = w->sample_rate / 2, bps = rate * align;
+        fwrite(&fmt, 2, 1, fd);
+        fwrite(&ch, 2, 1, fd);
+        fwrite(&rate, 4, 1, fd);
+        fwrite(&bps, 4, 1, fd);
+        fwrite(&align, 2, 1, fd);
+        fwrite(&bits, 2, 1, fd);
+    }
+    fwrite("data", 1, 4, fd);
+    fwrite(&data_size, 4, 1, fd);
+    fwrite(w->samples, 2, w->num_samples * w->num_channels, fd);
+    fclose(fd);
+    return 0;
+}
+
+int mimic_play_wave(cst_wave *w)
+{
+    return w ? 0 : -1;
+}
+
+/* voices */
+/* Selected voices are kept in a global list and returned again for the same
+ * name, as flite_voice_select does with flite_voice_list */
+static cst_voice *voice_list = NULL;
+
+static void check_voice(const cst_voice *v)
+{
+    /* flite would use freed memory, fail loudly instead */
+    if (v->deleted)
+        fatal("use of a deleted voice", v->name);
+}
+
+cst_voice *mimic_voice_select(const char *name)
+{
+    cst_voice *v;
+    if (name == NULL || strstr(name, "missing") != NULL)
+        return NULL;
+    for (v = voice_list; v; v = v->next) {
+        if (strcmp(v->name, name) == 0) {
+            check_voice(v);
+            return v;
+        }
+    }
+    v = calloc(1, sizeof(cst_voice));
+    v->name = xstrdup(name);
+    v->features = new_features();
+    v->ffunctions = new_features();
+    feat_set_int(v->features, "sample_rate", SAMPLE_RATE);
+    if (getenv("FAKE_MIMIC_VOICE_MB")) {
+        size_t i;
+        v->data_size = (size_t)atol(getenv("FAKE_MIMIC_VOICE_MB")) << 20;
+        v->data = malloc(v->data_size ? v->data_size : 1);
+        for (i = 0; i < v->data_size; i++)
+            v->data[i] = (unsigned char)(i * 31);
+    }
+    v->next = voice_list;
+    voice_list = v;
+    return v;
+}
+
+cst_voice *mimic_voice_load(const char *path)
+{
+    return mimic_voice_select(path);
+}
+
+/* Frees the voice data but keeps the struct, still in the voice list, so a
+ * later use is detected */
+void delete_voice(cst_voice *v)
+{
+    if (v == NULL)
+        return;
+    check_voice(v);
+    v->deleted = 1;
+    free(v->data);
+    v->data = NULL;
+    delete_features(v->features);
+    delete_features(v->ffunctions);
+    v->features = v->ffunctions = NULL;
+}
+
+/* utterances */
+cst_utterance *new_utterance(void)
+{
+    cst_utterance *u = calloc(1, sizeof(cst_utterance));
+    u->features = new_features();
+    u->ffunctions = new_features();
+    u->relations = new_features();
+    return u;
+}
+
+void utt_set_input_text(cst_utterance *u, const char *text)
+{
+    free(u->text);
+    u->text = xstrdup(text ? text : "");
+}
+
+cst_utterance *utt_init(cst_utterance *u, cst_voice *v)
+{
+    check_voice(v);
+    u->voice = v;
+    feat_copy_into(v->features, u->features);
+    return u;
+}
+
+static cst_relation *utt_relation_create(cst_utterance *u, const char *name)
+{
+    cst_relation *r = calloc(1, sizeof(cst_relation));
+    r->name = xstrdup(name);
+    r->next = u->rels;
+    u->rels = r;
+    return r;
+}
+
+static void synth_wave(cst_utterance *u, float dur)
+{
+    cst_wave *w = new_wave();
+    const cst_voice *v = (const cst_voice *)u->voice;
+    long work = get_work();
+    volatile long sink = 0;
+    int i;
+    long k;
+    /* Read, never write, the voice data like a real voice's units */
+    if (v != NULL)
+        for (k = 0; k < (long)v->data_size; k += 4096)
+            sink += v->data[k];
+    /* Speak.sample_rate divides this field by the sample size */
+    w->sample_rate = SAMPLE_RATE * 2;
+    w->num_samples = (int)(dur * SAMPLE_RATE + 0.5f);
+    w->samples = malloc(sizeof(short) * (w->num_samples ? w->num_samples : 1));
+    for (i = 0; i < w->num_samples; i++) {
+        w->samples[i] = (short)(((i * 37) % 2000) - 1000);
+        for (k = 0; k < work; k++)
+            sink += k;
+    }
+    u->wave = w;
+}
+
+static void add_segment(cst_relation *seg, cst_item *syl, const char *name,
+                        float end)
+{
+    cst_item *i = relation_append(seg, NULL);
+    feat_set_string(i->contents->features, "name", name);
+    feat_set_float(i->contents->features, "end", end);
+    if (syl != NULL)
+        item_append_daughter(syl, i);
+}
+
+/* Segment: a pause, a segment per letter, a pause.
+ * Word: a word per run of letters, each one Syllable of its letters, linked
+ * in SylStructure. Only segments have an end, as in flite. */
+cst_utterance *utt_synth(cst_utterance *u)
+{
+    cst_relation *seg = utt_relation_create(u, "Segment");
+    cst_relation *syl = utt_relation_create(u, "Syllable");
+    cst_relation *word = utt_relation_create(u, "Word");
+    cst_relation *sylstructure = utt_relation_create(u, "SylStructure");
+    cst_item *w = NULL, *s = NULL;
+    const cst_val *hook;
+    const char *c;
+    float t = 0.0f;
+    char phone[2] = {0, 0};
+    char wbuf[256];
+    int wlen = 0;
+
+    add_segment(seg, NULL, "pau", t += SEGMENT_DUR);
+    for (c = u->text ? u->text : ""; ; c++) {
+        if (*c && isalpha((unsigned char)*c)) {
+            if (w == NULL) {
+                w = relation_append(word, NULL);
+                s = relation_append(syl, NULL);
+                feat_set_string(s->contents->features, "name", "syl");
+                feat_set_int(s->contents->features, "stress", 0);
+                s = item_append_daughter(relation_append(sylstructure, w), s);
+            }
+            phone[0] = (char)tolower((unsigned char)*c);
+            add_segment(seg, s, phone, t += SEGMENT_DUR);
+            if (wlen < (int)sizeof(wbuf) - 1)
+                wbuf[wlen++] = phone[0];
+        } else if (w != NULL) {
+            wbuf[wlen] = '\0';
+            feat_set_string(w->contents->features, "name", wbuf);
+            w = s = NULL;
+            wlen = 0;
+        }
+        if (*c == '\0')
+            break;
+    }
+    add_segment(seg, NULL, "pau", t += SEGMENT_DUR);
+
+    hook = feat_val(u->features, "wave_synth_func");
+    if (hook && hook->type == 3) {
+        ((cst_uttfunc)hook->fn)(u);
+        return u;
+    }
+    synth_wave(u, t);
+    return u;
+}
+
+cst_wave *utt_wave(cst_utterance *u)
+{
+    return u ? (cst_wave *)u->wave : NULL;
+}
+
+void delete_utterance(cst_utterance *u)
+{
+    cst_relation *r, *n;
+    if (u == NULL)
+        return;
+    for (r = u->rels; r; r = n) {
+        n = r->next;
+        delete_relation(r);
+    }
+    delete_features(u->features);
+    delete_features(u->ffunctions);
+    delete_features(u->relations);
+    delete_wave((cst_wave *)u->wave);
+    free(u->text);
+    free(u);
+}
+
+cst_wave *mimic_text_to_wave(const char *text, cst_voice *v)
+{
+    cst_utterance *u = new_utterance();
+    cst_wave *w;
+    utt_set_input_text(u, text);
+    utt_init(u, v);
+    utt_synth(u);
+    w = (cst_wave *)u->wave;
+    u->wave = NULL;
+    delete_utterance(u);
+    return w;
+}
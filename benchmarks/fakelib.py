@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+"""
+Build the deterministic stand-in libttsmimiccore from fake_mimic/fake_mimic.c
+so the benchmarks run on any Linux box with a C compiler.
+"""
+import os
+import subprocess
+import tempfile
+
+SOURCE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                      'fake_mimic', 'fake_mimic.c')
+
+
+def build(outdir=None, cc=None):
+    """ Compile the stand-in library (if out of date) and return its path. """
+    if outdir is None:
+        outdir = os.path.join(tempfile.gettempdir(), 'pymimic-fake-mimic')
+    os.makedirs(outdir, exist_ok=True)
+    lib_fn = os.path.join(outdir, 'libttsmimiccore.so')
+    if (not os.path.isfile(lib_fn) or
+            os.path.getmtime(lib_fn) < os.path.getmtime(SOURCE)):
+        cc = cc or os.environ.get('CC', 'cc')
+        subprocess.check_call([cc, '-O2', '-shared', '-fPIC', '-o', lib_fn,
+                               SOURCE])
+    return lib_fn
+
+
+if __name__ == '__main__':
+    print(build())
@@ -0,0 +1,256 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+pymimic benchmark suite.
+
+Micro benchmarks time single wrapper operations (voice load, Speak
+construction, bin(), phoneme extraction), macro benchmarks time end to end
+synthesis (real-time factor, time to first audio, batch throughput for
+1..N workers). Latencies are reported as p50/p99, together with the peak
+RSS after each benchmark, as JSON.
+
+Run against the installed libttsmimiccore, or with --fake against the
+deterministic stand-in built from benchmarks/fake_mimic.
+
+Examples:
+    python benchmarks/run.py --fake --output results.json
+    python benchmarks/run.py --voice cmu_us_rms.flitevox --workers 1 2 4
+"""
+from __future__ import print_function, division
+
+import argparse
+import json
+import os
+import platform
+import resource
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+# Benchmark the checkout this script belongs to
+sys.path.insert(0, os.path.dirname(HERE))
+
+import pymimic  # noqa: E402
+from pymimic import (Speak, synthesize_iter, synthesize_many,  # noqa: E402
+                     text_to_phonemes, voice_registry)
+
+SHORT_TEXT = "Hello there, this is a benchmark."
+LONG_TEXT = " ".join([
+    "The quick brown fox jumps over the lazy dog.",
+    "Pack my box with five dozen liquor jugs.",
+    "How vexingly quick daft zebras jump!",
+    "Sphinx of black quartz, judge my vow.",
+] * 5)
+
+
+def peak_rss_mb():
+    """ Peak resident set size of this process and of waited children. """
+    scale = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale
+    return {'self': round(own, 1), 'children': round(children, 1)}
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+
+def summarize(latencies):
+    return {
+        'n': len(latencies),
+        'mean_ms': 1000 * sum(latencies) / len(latencies),
+        'p50_ms': 1000 * percentile(latencies, 50),
+        'p99_ms': 1000 * percentile(latencies, 99),
+    }
+
+
+def measure(func, number, setup=None):
+    """ Per call latencies of func(arg), arg = setup() outside the timing. """
+    latencies = []
+    for _ in range(number):
+        arg = setup() if setup is not None else None
+        start = time.perf_counter()
+        func(arg)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def fresh_speak(voice, text):
+    def setup():
+        return Speak(text, voice)
+    return setup
+
+
+def bench_voice_load(args, voice):
+    """ First load of the voice, timed in main(), and cached lookups. """
+    def cached(_):
+        voice_registry.release(voice_registry.acquire(args.voice))
+    result = summarize(measure(cached, args.number))
+    result['first_load_ms'] = 1000 * args.first_load
+    return result
+
+
+def bench_speak(args, voice):
+    return summarize(measure(lambda _: Speak(SHORT_TEXT, voice), args.number))
+
+
+def bench_bin(args, voice):
+    return summarize(measure(lambda s: s.bin(), args.number,
+                             fresh_speak(voice, LONG_TEXT)))
+
+
+def bench_phonemes(args, voice):
+    return summarize(measure(lambda s: s.phonemes, args.number,
+                             fresh_speak(voice, LONG_TEXT)))
+
+
+def bench_relation_table(args, voice):
+    return summarize(measure(
+        lambda s: s.relation_table('Segment', ['name', 'end', 'dur']),
+        args.number, fresh_speak(voice, LONG_TEXT)))
+
+
+def bench_frontend(args, voice):
+    return summarize(measure(lambda _: text_to_phonemes(LONG_TEXT, voice),
+                             args.number))
+
+
+def bench_rtf(args, voice):
+    synth_time = 0.0
+    audio_time = 0.0
+    for _ in range(args.number):
+        start = time.perf_counter()
+        s = Speak(LONG_TEXT, voice)
+        synth_time += time.perf_counter() - start
+        audio_time += s.num_samples / s.sample_rate
+    return {'n': args.number, 'rtf': synth_time / audio_time}
+
+
+def bench_time_to_first_audio(args, voice):
+    def first_chunk(_):
+        stream = synthesize_iter(LONG_TEXT, voice)
+        next(stream)
+        stream.close()
+    result = summarize(measure(first_chunk, args.number))
+    result['full_ms'] = summarize(measure(
+        lambda _: Speak(LONG_TEXT, voice), args.number))['p50_ms']
+    return result
+
+
+def bench_batch(args, voice):
+    texts = [LONG_TEXT] * args.batch_size
+    results = {}
+    for workers in args.workers:
+        for shared_memory in (False, True):
+            start = time.perf_counter()
+            audio_time = 0.0
+            for chunk in synthesize_many(texts, args.voice, workers=workers,
+                                         shared_memory=shared_memory):
+                audio_time += chunk.duration
+                if shared_memory:
+                    chunk.release()
+            elapsed = time.perf_counter() - start
+            key = str(workers) + ('_shm' if shared_memory else '')
+            results[key] = {
+                'texts_per_s': len(texts) / elapsed,
+                'rtf': elapsed / audio_time,
+                'peak_rss_mb': peak_rss_mb(),
+            }
+    return results
+
+
+def bench_soak(args, voice):
+    """ Repeated synthesis, native objects and RSS must not grow. """
+    before = pymimic.live_objects()
+    rss_before = peak_rss_mb()['self']
+    for _ in range(args.number * 20):
+        with Speak(SHORT_TEXT, voice) as s:
+            s.bin()
+        voice.set_features([('duration_stretch', 1.0)])
+    after = pymimic.live_objects()
+    return {
+        'n': args.number * 20,
+        'leaked_objects': dict((kind, after[kind] - before[kind])
+                               for kind in after),
+        'rss_growth_mb': peak_rss_mb()['self'] - rss_before,
+    }
+
+
+BENCHMARKS = [
+    ('voice_load', bench_voice_load),
+    ('speak', bench_speak),
+    ('bin', bench_bin),
+    ('phonemes', bench_phonemes),
+    ('relation_table', bench_relation_table),
+    ('frontend', bench_frontend),
+    ('rtf', bench_rtf),
+    ('time_to_first_audio', bench_time_to_first_audio),
+    ('batch', bench_batch),
+    ('soak', bench_soak),
+]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description=__doc__.strip().split("\n")[0])
+    parser.add_argument('--voice', default='slt', help='Voice name or path')
+    parser.add_argument('--fake', action='store_true',
+                        help='Use the stand-in library from fake_mimic')
+    parser.add_argument('--fake-work', type=int, default=200,
+                        help='Busy loop iterations per sample in the stand-in')
+    parser.add_argument('--number', type=int, default=50,
+                        help='Repetitions of each micro benchmark')
+    parser.add_argument('--workers', type=int, nargs='+',
+                        default=[1, 2, os.cpu_count() or 1])
+    parser.add_argument('--batch-size', type=int, default=64)
+    parser.add_argument('--only', nargs='+',
+                        choices=[name for name, _ in BENCHMARKS])
+    parser.add_argument('--output', help='JSON output file (default stdout)')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.fake:
+        import fakelib
+        os.environ['FAKE_MIMIC_WORK'] = str(args.fake_work)
+        pymimic.load(path=fakelib.build())
+    else:
+        pymimic.load()
+    # Voices are only loaded through the registry: dropping a Voice frees
+    # it, also a voice compiled into the library that is selected again
+    start = time.perf_counter()
+    voice = voice_registry.acquire(args.voice)
+    args.first_load = time.perf_counter() - start
+
+    results = {
+        'meta': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'library': pymimic.pymimic.mimic_lib._name,
+            'fake': args.fake,
+            'voice': args.voice,
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'benchmarks': {},
+    }
+    for name, bench in BENCHMARKS:
+        if args.only and name not in args.only:
+            continue
+        print("running", name, file=sys.stderr)
+        result = bench(args, voice)
+        result.setdefault('peak_rss_mb', peak_rss_mb())
+        results['benchmarks'][name] = result
+
+    output = json.dumps(results, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as f:
+            print(output, file=f)
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,2 +1,37 @@
 from .pymimic import *
 
+import importlib
+import os
+
+# The optional parts are imported on first use, keeping import pymimic fast
+_lazy_names = {
+    'synthesize_many': 'pool',
+    'ThreadPoolSynthesizer': 'pool',
+    'SharedVoicePool': 'pool',
+    'process_memory': 'pool',
+    'synthesize_document': 'document',
+    'VoiceRegistry': 'registry',
+    'voice_registry': 'registry',
+    'preload_voices': 'registry',
+    'SynthesisCache': 'cache',
+    'WavStreamWriter': 'audio',
+    'OutputFormat': 'audio',
+}
+
+
+def __getattr__(name):
+    module = _lazy_names.get(name)
+    if module is None:
+        raise AttributeError("module {!r} has no attribute {!r}".format(
+            __name__, name))
+    value = getattr(importlib.import_module('.' + module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_lazy_names))
+
+
+if os.environ.get('PYMIMIC_EAGER_LOAD'):
+    load()
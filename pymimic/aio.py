@@ -0,0 +1,131 @@
+"""
+    asyncio front end for synthesis.
+
+    Synthesis runs on an executor so the event loop is not blocked. Every
+    executor job converts its result to a SpeechChunk and frees the native
+    utterance and wave before returning, so cancelling a coroutine can only
+    drop Python data, never leak native memory.
+"""
+import asyncio
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from os import cpu_count
+import weakref
+
+from .pymimic import Speak, SpeechChunk, Voice, split_text
+from .registry import voice_registry
+
+
+def _synthesize(text, voice, features):
+    if isinstance(voice, Voice):
+        with Speak(text, voice, features) as speak:
+            return SpeechChunk.from_speak(speak)
+    # Process executors get a voice name, load it once per worker
+    with voice_registry.voice(voice) as v:
+        with Speak(text, v, features) as speak:
+            return SpeechChunk.from_speak(speak)
+
+
+class Synthesizer():
+    """
+        Runs synthesis on executor, with at most max_concurrency native
+        syntheses in flight. executor None uses the default executor of
+        the event loop. With a ProcessPoolExecutor voices are passed to
+        the workers by name, features set on the voice are applied to
+        each utterance instead. The limit holds per event loop, the
+        Synthesizer can be used from several loops in turn.
+    """
+    def __init__(self, executor=None, max_concurrency=None):
+        self.executor = executor
+        self.max_concurrency = max_concurrency or cpu_count() or 1
+        # A semaphore is bound to the loop it is first used in
+        self._semaphores = weakref.WeakKeyDictionary()
+
+    def _semaphore(self, loop):
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._semaphores[loop] = \
+                asyncio.Semaphore(self.max_concurrency)
+        return semaphore
+
+    async def speak(self, text, voice, features=[]):
+        if isinstance(self.executor, ProcessPoolExecutor) and \
+                isinstance(voice, Voice):
+            features = list(voice.feature_values.items()) + list(features)
+            voice = voice.name
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphore(loop)
+        await semaphore.acquire()
+        try:
+            future = loop.run_in_executor(self.executor, _synthesize,
+                                          text, voice, features)
+        except BaseException:
+            semaphore.release()
+            raise
+        # Hold the slot until the native call has really finished, even if
+        # the awaiting task is cancelled before that.
+        future.add_done_callback(partial(self._done, semaphore))
+        return await asyncio.shield(future)
+
+    @staticmethod
+    def _done(semaphore, future):
+        semaphore.release()
+        if not future.cancelled():
+            # Mark the exception as retrieved when nobody awaits it anymore
+            future.exception()
+
+    async def stream(self, text, voice, features=[], clauses=False,
+                     prefetch=1):
+        """
+            Async generator of SpeechChunks per sentence (or clause).
+
+            Up to prefetch chunks after the current one are synthesized
+            ahead. Closing or cancelling the generator cancels chunks not
+            yet started and drops the ones already synthesized.
+        """
+        tasks = deque()
+        start = 0.0
+        try:
+            for piece in split_text(text, clauses):
+                tasks.append(asyncio.ensure_future(
+                    self.speak(piece, voice, features)))
+                if len(tasks) > prefetch:
+                    chunk = await tasks.popleft()
+                    chunk.start = start
+                    start += chunk.duration
+                    yield chunk
+            while tasks:
+                chunk = await tasks.popleft()
+                chunk.start = start
+                start += chunk.duration
+                yield chunk
+        finally:
+            for task in tasks:
+                task.cancel()
+
+
+_default = None
+
+
+def configure(executor=None, max_concurrency=None):
+    """
+        Set up the Synthesizer used by the module level functions.
+    """
+    global _default
+    _default = Synthesizer(executor, max_concurrency)
+    return _default
+
+
+def _get_default():
+    if _default is None:
+        configure()
+    return _default
+
+
+async def speak(text, voice, features=[]):
+    return await _get_default().speak(text, voice, features)
+
+
+def stream(text, voice, features=[], clauses=False, prefetch=1):
+    return _get_default().stream(text, voice, features, clauses, prefetch)
@@ -0,0 +1,309 @@
+from __future__ import absolute_import, division, print_function, \
+                       unicode_literals
+
+from array import array
+from math import gcd
+import struct
+import sys
+
+# numpy is slow to import, _require_numpy() imports it on first use
+numpy = None
+sliding_window_view = None
+
+# WAVE format tags
+WAVE_FORMAT_PCM = 1
+WAVE_FORMAT_IEEE_FLOAT = 3
+WAVE_FORMAT_ALAW = 6
+WAVE_FORMAT_MULAW = 7
+
+# Bytes per sample and WAVE format tag of each output encoding
+ENCODINGS = {
+    'int16': (2, WAVE_FORMAT_PCM),
+    'float32': (4, WAVE_FORMAT_IEEE_FLOAT),
+    'mulaw': (1, WAVE_FORMAT_MULAW),
+    'alaw': (1, WAVE_FORMAT_ALAW),
+}
+
+# Segment end points of the G.711 encoders
+_ULAW_SEG_END = [0x3F, 0x7F, 0xFF, 0x1FF, 0x3FF, 0x7FF, 0xFFF, 0x1FFF]
+_ALAW_SEG_END = [0x1F, 0x3F, 0x7F, 0xFF, 0x1FF, 0x3FF, 0x7FF, 0xFFF]
+
+# RIFF size used while the length of a stream is unknown
+_UNKNOWN_SIZE = 0xFFFFFFFF
+
+
+def wav_header(data_size, sample_rate, channels=1, sample_width=2,
+               format_tag=WAVE_FORMAT_PCM):
+    """
+        44 byte RIFF/WAVE header for data_size bytes of audio data.
+    """
+    if data_size is None:
+        riff_size = data_size = _UNKNOWN_SIZE
+    else:
+        riff_size = min(36 + data_size, _UNKNOWN_SIZE)
+    block_align = channels * sample_width
+    return struct.pack('<4sI4s4sIHHIIHH4sI',
+                       b'RIFF', riff_size, b'WAVE',
+                       b'fmt ', 16, format_tag, channels, sample_rate,
+                       sample_rate * block_align, block_align,
+                       8 * sample_width,
+                       b'data', data_size)
+
+
+def little_endian(data, sample_width=2):
+    """
+        data as little endian samples, unchanged on little endian hosts.
+    """
+    if sys.byteorder == 'little' or sample_width == 1:
+        return data
+    samples = array('h' if sample_width == 2 else 'f')
+    samples.frombytes(bytes(data))
+    samples.byteswap()
+    return samples.tobytes()
+
+
+def write_audio(fileobj, data, sample_rate, channels=1, format='wav',
+                sample_width=2, format_tag=WAVE_FORMAT_PCM):
+    """
+        Write audio data (bytes or a buffer) to a writable file object,
+        with a WAV header if format is 'wav', as is if format is 'raw'.
+    """
+    if format not in ('wav', 'raw'):
+        raise ValueError("Unknown audio format {}".format(format))
+    data = little_endian(data, sample_width)
+    if format == 'wav':
+        fileobj.write(wav_header(memoryview(data).nbytes,
+                                 sample_rate, channels, sample_width,
+                                 format_tag))
+    fileobj.write(data)
+
+
+class WavStreamWriter():
+    """
+        Writes a WAV header first and audio data as it arrives.
+
+        The length is not known up front, so the header carries the
+        maximum size, which players treat as "until end of stream". On
+        close() the real sizes are filled in if fileobj is seekable.
+    """
+    def __init__(self, fileobj, sample_rate, channels=1, sample_width=2,
+                 format_tag=WAVE_FORMAT_PCM):
+        self.fileobj = fileobj
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.sample_width = sample_width
+        self.format_tag = format_tag
+        self.data_size = 0
+        self._start = None
+        try:
+            if fileobj.seekable():
+                self._start = fileobj.tell()
+        except (AttributeError, IOError, OSError):
+            pass
+        fileobj.write(wav_header(None, sample_rate, channels, sample_width,
+                                 format_tag))
+
+    def write(self, data):
+        data = little_endian(data, self.sample_width)
+        self.fileobj.write(data)
+        self.data_size += memoryview(data).nbytes
+
+    def close(self):
+        if self._start is None:
+            return
+        end = self.fileobj.tell()
+        self.fileobj.seek(self._start)
+        self.fileobj.write(wav_header(self.data_size, self.sample_rate,
+                                      self.channels, self.sample_width,
+                                      self.format_tag))
+        self.fileobj.seek(end)
+        self._start = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _require_numpy(purpose='sample format conversion'):
+    """ The numpy module, imported on first use """
+    global numpy, sliding_window_view
+    if numpy is None:
+        try:
+            from numpy.lib.stride_tricks import sliding_window_view
+            import numpy
+        except ImportError:
+            raise ImportError('numpy is required for {}'.format(purpose))
+    return numpy
+
+
+def int16_to_float32(samples):
+    _require_numpy()
+    return (numpy.asarray(samples, dtype=numpy.int16) /
+            numpy.float32(32768)).astype(numpy.float32)
+
+
+def float32_to_int16(samples):
+    _require_numpy()
+    samples = numpy.rint(numpy.asarray(samples) * 32768)
+    return numpy.clip(samples, -32768, 32767).astype(numpy.int16)
+
+
+def mulaw_encode(samples):
+    """
+        G.711 mu-law bytes for int16 samples.
+    """
+    _require_numpy()
+    pcm = numpy.asarray(samples, dtype=numpy.int32) >> 2
+    mask = numpy.where(pcm < 0, 0x7F, 0xFF)
+    pcm = numpy.minimum(numpy.abs(pcm), 8159) + (0x84 >> 2)
+    seg = numpy.searchsorted(_ULAW_SEG_END, pcm)
+    uval = (seg << 4) | ((pcm >> (seg + 1)) & 0xF)
+    uval = numpy.where(seg >= 8, 0x7F, uval)
+    return (uval ^ mask).astype(numpy.uint8)
+
+
+def alaw_encode(samples):
+    """
+        G.711 A-law bytes for int16 samples.
+    """
+    _require_numpy()
+    pcm = numpy.asarray(samples, dtype=numpy.int32) >> 3
+    mask = numpy.where(pcm >= 0, 0xD5, 0x55)
+    pcm = numpy.where(pcm >= 0, pcm, -pcm - 1)
+    seg = numpy.searchsorted(_ALAW_SEG_END, pcm)
+    aval = (seg << 4) | ((pcm >> numpy.maximum(seg, 1)) & 0xF)
+    aval = numpy.where(seg >= 8, 0x7F, aval)
+    return (aval ^ mask).astype(numpy.uint8)
+
+
+class Resampler():
+    """
+        Streaming polyphase resampler for mono float samples.
+
+        The filter history is carried between calls to process(), so a
+        signal fed in chunks gives the same output as fed at once. The
+        filter delay is compensated, flush() returns the samples still
+        held back at the end of the stream.
+    """
+    def __init__(self, from_rate, to_rate, taps_per_phase=16):
+        _require_numpy()
+        g = gcd(from_rate, to_rate)
+        self.up = to_rate // g
+        self.down = from_rate // g
+        self.taps = taps_per_phase
+        n = self.taps * self.up
+        cutoff = 0.5 / max(self.up, self.down)
+        # Odd length filter centered on a whole sample, padded with a zero
+        # tap to fill the phases, so the delay compensation is exact.
+        self._delay = (n - 1) // 2
+        window = numpy.zeros(n)
+        window[:2 * self._delay + 1] = numpy.kaiser(2 * self._delay + 1, 8.0)
+        t = numpy.arange(n) - self._delay
+        h = 2 * cutoff * numpy.sinc(2 * cutoff * t) * window
+        h *= self.up / h.sum()
+        # _phases[phase, j] weights input sample base - (taps - 1) + j
+        self._phases = h.reshape(self.taps, self.up).T[:, ::-1].copy()
+        self._history = numpy.zeros(self.taps - 1)
+        self._offset = -(self.taps - 1)
+        self._next = 0
+        self._consumed = 0
+
+    def process(self, samples):
+        samples = numpy.asarray(samples, dtype=numpy.float64)
+        self._consumed += len(samples)
+        return self._run(samples).astype(numpy.float32)
+
+    def flush(self):
+        """
+            Remaining output, after which the total output length is
+            the input length scaled by the rate ratio.
+        """
+        total = -(-self._consumed * self.up // self.down)
+        if total <= self._next:
+            return numpy.zeros(0, dtype=numpy.float32)
+        base = ((total - 1) * self.down + self._delay) // self.up
+        last = self._offset + len(self._history) - 1
+        out = self._run(numpy.zeros(max(0, base - last)))
+        return out[:total - (self._next - len(out))].astype(numpy.float32)
+
+    def _run(self, samples):
+        if len(samples) == 0:
+            return numpy.zeros(0)
+        up, down, taps = self.up, self.down, self.taps
+        buf = numpy.concatenate((self._history, samples))
+        first = self._offset
+        last = first + len(buf) - 1
+        end = max(self._next, ((last + 1) * up - self._delay + down - 1) // down)
+        pos = numpy.arange(self._next, end) * down + self._delay
+        rows = pos // up - (taps - 1) - first
+        windows = sliding_window_view(buf, taps)[rows]
+        out = numpy.einsum('ij,ij->i', windows, self._phases[pos % up])
+        self._next = end
+        keep = taps - 1
+        self._history = buf[len(buf) - keep:] if keep else buf[:0]
+        self._offset = last + 1 - keep
+        return out
+
+
+class OutputFormat():
+    """
+        Target sample rate (None keeps the voice rate) and encoding, one
+        of 'int16', 'float32', 'mulaw' or 'alaw'.
+    """
+    def __init__(self, sample_rate=None, encoding='int16', taps_per_phase=16):
+        if encoding not in ENCODINGS:
+            raise ValueError("Unknown encoding {}".format(encoding))
+        _require_numpy()
+        self.sample_rate = sample_rate
+        self.encoding = encoding
+        self.taps_per_phase = taps_per_phase
+
+    @property
+    def sample_width(self):
+        return ENCODINGS[self.encoding][0]
+
+    def converter(self, source_rate):
+        return FormatConverter(self, source_rate)
+
+
+class FormatConverter():
+    """
+        Converts a stream of int16 samples to an OutputFormat chunk by
+        chunk, keeping resampler state across chunks.
+    """
+    def __init__(self, output_format, source_rate):
+        self.encoding = output_format.encoding
+        self.sample_rate = output_format.sample_rate or source_rate
+        self.resampler = None
+        if self.sample_rate != source_rate:
+            self.resampler = Resampler(source_rate, self.sample_rate,
+                                       output_format.taps_per_phase)
+
+    def process(self, samples):
+        """
+            Convert int16 samples (array or buffer) to output bytes.
+        """
+        if not isinstance(samples, numpy.ndarray):
+            samples = numpy.frombuffer(samples, dtype=numpy.int16)
+        if self.resampler is None:
+            if self.encoding == 'int16':
+                return samples.tobytes()
+            return self._encode(int16_to_float32(samples))
+        return self._encode(self.resampler.process(int16_to_float32(samples)))
+
+    def flush(self):
+        if self.resampler is None:
+            return b''
+        return self._encode(self.resampler.flush())
+
+    def _encode(self, samples):
+        if self.encoding == 'float32':
+            return samples.astype(numpy.float32).tobytes()
+        samples = float32_to_int16(samples)
+        if self.encoding == 'mulaw':
+            return mulaw_encode(samples).tobytes()
+        if self.encoding == 'alaw':
+            return alaw_encode(samples).tobytes()
+        return samples.tobytes()
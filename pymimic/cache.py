@@ -0,0 +1,242 @@
+from __future__ import absolute_import, division, print_function, \
+                       unicode_literals
+
+from collections import OrderedDict
+from hashlib import sha256
+from threading import RLock
+
+import json
+import os
+import struct
+import tempfile
+import unicodedata
+
+from .pymimic import Speak, SpeechChunk
+from .registry import VoiceRegistry
+
+
+def normalize_text(text):
+    """
+        Text as used in cache keys: NFC normalized with whitespace runs
+        collapsed to single spaces.
+    """
+    return ' '.join(unicodedata.normalize('NFC', text).split())
+
+
+def _as_text(value):
+    if isinstance(value, bytes):
+        return value.decode('utf-8')
+    return value
+
+
+def cache_key(voice, text, features=[]):
+    """
+        Content hash of voice name or path, the features set on the voice,
+        normalized text and features.
+    """
+    key = [VoiceRegistry.key(voice.name),
+           sorted(voice.feature_values.items()),
+           normalize_text(text),
+           [[_as_text(name), _as_text(val)] for name, val in features]]
+    return sha256(json.dumps(key).encode('utf-8')).hexdigest()
+
+
+def _dump_chunk(chunk):
+    header = json.dumps({
+        'text': chunk.text,
+        'sample_rate': chunk.sample_rate,
+        'channels': chunk.channels,
+        # phone names are bytes from the library, latin-1 round trips them
+        'phonemes': [[name.decode('latin-1'), end]
+                     for name, end in chunk.phonemes]
+    }).encode('utf-8')
+    return struct.pack('<I', len(header)) + header
+
+
+def _load_chunk(data):
+    size, = struct.unpack_from('<I', data)
+    header = json.loads(data[4:4 + size].decode('utf-8'))
+    phonemes = [(name.encode('latin-1'), end)
+                for name, end in header['phonemes']]
+    return SpeechChunk(header['text'], data[4 + size:], phonemes,
+                       header['sample_rate'], header['channels'], 0.0)
+
+
+class SynthesisCache():
+    """
+        Two level cache of synthesis results in front of Speak.
+
+        The first level is an in-memory LRU bounded by max_items and
+        max_bytes of PCM data. If directory is given, results are also
+        stored there, one file per key. Files are written to a temporary
+        name and renamed into place, so concurrent readers, also in other
+        processes, never see partial entries. When the directory grows
+        over max_disk_bytes the oldest entries are removed until it is
+        under disk_low_water of it, so eviction does not rescan the
+        directory on every following put.
+    """
+    disk_low_water = 0.9
+
+    def __init__(self, max_items=256, max_bytes=None, directory=None,
+                 max_disk_bytes=None):
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.max_disk_bytes = max_disk_bytes
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.disk_evictions = 0
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = RLock()
+        self._disk_bytes = 0
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+            self._disk_bytes = sum(size for _, size, _ in self._disk_entries())
+
+    @property
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'disk_evictions': self.disk_evictions,
+            'items': len(self._memory),
+            'bytes': self._memory_bytes,
+            'disk_bytes': self._disk_bytes
+        }
+
+    def speak(self, text, voice, features=[]):
+        """
+            SpeechChunk for text, synthesized only on a cache miss.
+        """
+        key = cache_key(voice, text, features)
+        chunk = self.get(key)
+        if chunk is None:
+            with Speak(normalize_text(text), voice, features) as speak:
+                chunk = SpeechChunk.from_speak(speak)
+            self.put(key, chunk)
+        return chunk
+
+    def get(self, key):
+        with self._lock:
+            chunk = self._memory.get(key)
+            if chunk is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return chunk
+        chunk = self._disk_get(key)
+        with self._lock:
+            if chunk is None:
+                self.misses += 1
+            else:
+                self.disk_hits += 1
+                self._memory_put(key, chunk)
+        return chunk
+
+    def put(self, key, chunk):
+        with self._lock:
+            self._memory_put(key, chunk)
+        self._disk_put(key, chunk)
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+
+    def _memory_put(self, key, chunk):
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._memory_bytes -= len(old.data)
+        self._memory[key] = chunk
+        self._memory_bytes += len(chunk.data)
+        while self._memory and (
+                (self.max_items is not None and
+                 len(self._memory) > self.max_items) or
+                (self.max_bytes is not None and
+                 self._memory_bytes > self.max_bytes)):
+            _, old = self._memory.popitem(last=False)
+            self._memory_bytes -= len(old.data)
+            self.evictions += 1
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key)
+
+    def _disk_get(self, key):
+        if self.directory is None:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            # mtime orders entries for eviction
+            os.utime(path, None)
+        except (IOError, OSError):
+            return None
+        try:
+            return _load_chunk(data)
+        except (ValueError, KeyError, TypeError, struct.error):
+            # Corrupt or from an incompatible version, synthesize again
+            return None
+
+    def _disk_put(self, key, chunk):
+        if self.directory is None:
+            return
+        path = self._path(key)
+        dirname = os.path.dirname(path)
+        os.makedirs(dirname, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=dirname, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(_dump_chunk(chunk))
+                f.write(chunk.data)
+            size = os.path.getsize(tmp_path)
+            try:
+                # An entry written before, e.g. by another process
+                size -= os.path.getsize(path)
+            except OSError:
+                pass
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        with self._lock:
+            self._disk_bytes += size
+            if (self.max_disk_bytes is not None and
+                    self._disk_bytes > self.max_disk_bytes):
+                self._disk_evict()
+
+    def _disk_entries(self):
+        for sub in os.listdir(self.directory):
+            subdir = os.path.join(self.directory, sub)
+            if not os.path.isdir(subdir):
+                continue
+            for name in os.listdir(subdir):
+                if name.startswith('.tmp-'):
+                    continue
+                path = os.path.join(subdir, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                yield path, st.st_size, st.st_mtime
+
+    def _disk_evict(self):
+        # Rescan, other processes may share the directory
+        entries = sorted(self._disk_entries(), key=lambda e: e[2])
+        self._disk_bytes = sum(size for _, size, _ in entries)
+        if self._disk_bytes <= self.max_disk_bytes:
+            return
+        target = self.max_disk_bytes * self.disk_low_water
+        for path, size, _ in entries:
+            if self._disk_bytes <= target:
+                break
+            try:
+                os.unlink(path)
+            except OSError:
+                continue
+            self._disk_bytes -= size
+            self.disk_evictions += 1
@@ -0,0 +1,132 @@
+"""
+    Parallel synthesis of long documents.
+
+    The document is split into sentences, which are synthesized in
+    parallel and stitched back together in order: sentences are separated
+    by a configurable silence (longer between paragraphs) and faded in and
+    out over a short crossfade, or overlapped by it when there is no
+    silence, so the joins do not click.
+"""
+from __future__ import absolute_import, division, print_function, \
+                       unicode_literals
+
+from array import array
+import re
+
+from .pool import ThreadPoolSynthesizer, synthesize_many
+from .pymimic import SpeechChunk, split_text
+
+_paragraph_re = re.compile(r'\n\s*\n')
+
+
+def split_document(text):
+    """
+        (sentence, paragraph start) pairs of text, paragraphs are
+        separated by blank lines.
+    """
+    for paragraph in _paragraph_re.split(text):
+        first = True
+        for sentence in split_text(paragraph):
+            yield sentence, first
+            first = False
+
+
+def _fade(samples, channels, fade_in):
+    frames = len(samples) // channels
+    out = array('h', samples)
+    for i in range(len(out)):
+        gain = (i // channels + 1) / (frames + 1)
+        if not fade_in:
+            gain = 1 - gain
+        out[i] = int(round(out[i] * gain))
+    return out
+
+
+def _mix(tail, head, channels):
+    frames = len(tail) // channels
+    out = array('h', tail)
+    for i in range(len(out)):
+        gain = (i // channels + 1) / (frames + 1)
+        value = int(round(tail[i] * (1 - gain) + head[i] * gain))
+        out[i] = max(-32768, min(32767, value))
+    return out
+
+
+def synthesize_document(text, voice, workers=None, features=[],
+                        sentence_silence=0.1, paragraph_silence=0.4,
+                        crossfade=0.01, processes=False):
+    """
+        Generator yielding a SpeechChunk per sentence of a document, in
+        document order, while later sentences are still being synthesized.
+
+        voice is a Voice or a voice name. Sentences are synthesized on
+        workers threads, or in worker processes if processes is set.
+        sentence_silence and paragraph_silence are the pauses in seconds
+        inserted between sentences and paragraphs, crossfade the length of
+        the fades at the joins.
+
+        The chunks together form one continuous stream: start is the
+        offset of a chunk in the stream and the phoneme end times are on
+        the same global timeline. The end of each sentence is held back
+        to fade it into the next one, it comes in a last chunk without
+        text.
+    """
+    pieces = list(split_document(text))
+    if not pieces:
+        return
+    texts = [sentence for sentence, _ in pieces]
+    if processes:
+        chunks = synthesize_many(texts, getattr(voice, 'name', voice),
+                                 workers, features)
+        synthesizer = None
+    else:
+        synthesizer = ThreadPoolSynthesizer(voice, workers, features)
+        chunks = synthesizer.map(texts)
+
+    try:
+        pos = 0
+        tail = None
+        for index, chunk in enumerate(chunks):
+            rate = chunk.sample_rate
+            channels = chunk.channels
+            fade = int(round(crossfade * rate)) * channels
+            samples = array('h')
+            samples.frombytes(bytes(chunk.data))
+            out = array('h')
+            if tail is None:
+                start = pos
+            else:
+                silence = paragraph_silence if pieces[index][1] \
+                    else sentence_silence
+                gap = int(round(silence * rate)) * channels
+                if gap:
+                    out.extend(_fade(tail, channels, False))
+                    out.extend(array('h', [0]) * gap)
+                    start = pos + len(tail) + gap
+                    head = min(fade, len(samples))
+                    samples[:head] = _fade(samples[:head], channels, True)
+                else:
+                    overlap = min(len(tail), len(samples) // 2)
+                    overlap -= overlap % channels
+                    out.extend(tail[:len(tail) - overlap])
+                    out.extend(_mix(tail[len(tail) - overlap:],
+                                    samples[:overlap], channels))
+                    start = pos + len(tail) - overlap
+                    samples = samples[overlap:]
+            keep = min(fade, len(samples) // 2)
+            keep -= keep % channels
+            tail = samples[len(samples) - keep:]
+            out.extend(samples[:len(samples) - keep])
+
+            offset = start / (rate * channels)
+            phonemes = [(name, end + offset) for name, end in chunk.phonemes]
+            yield SpeechChunk(chunk.text, out.tobytes(), phonemes, rate,
+                              channels, pos / (rate * channels))
+            pos += len(out)
+        if tail:
+            yield SpeechChunk('', tail.tobytes(), [], rate, channels,
+                              pos / (rate * channels))
+    finally:
+        chunks.close()
+        if synthesizer is not None:
+            synthesizer.close()
@@ -0,0 +1,231 @@
+"""
+    Optional instrumentation of synthesis calls.
+
+    Disabled by default. enable() installs a Metrics recorder that times the
+    native stages of every Utterance/Speak (wall and CPU time per stage in
+    histograms), counts utterances, samples and bytes, tracks audio seconds
+    produced per CPU second for each voice and passes an event per
+    synthesis to the configured sinks. While disabled the only cost is a
+    no-op call per stage.
+"""
+from __future__ import absolute_import, division, print_function, \
+                       unicode_literals
+
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import contextmanager
+from threading import Lock
+import json
+import logging
+import time
+
+# Histogram bucket upper bounds in seconds
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0)
+
+recorder = None
+
+
+class Histogram():
+    """
+        Bucketed observations, safe to observe from several threads.
+    """
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self._lock = Lock()
+
+    def observe(self, value):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += value
+
+    def cumulative(self):
+        """
+            (upper bound, cumulative count) pairs, the last bound is inf.
+        """
+        return self.snapshot()[0]
+
+    def snapshot(self):
+        """
+            cumulative() pairs, sum and count taken together.
+        """
+        with self._lock:
+            counts = list(self.counts)
+            total_sum, count = self.sum, self.count
+        pairs = []
+        total = 0
+        for bound, bucket in zip(self.buckets + (float('inf'),), counts):
+            total += bucket
+            pairs.append((bound, total))
+        return pairs, total_sum, count
+
+
+class Metrics():
+    """
+        Collected synthesis metrics.
+
+        sinks are callables receiving a dict per finished synthesis with
+        the voice, per stage (wall, cpu) seconds, samples, bytes, audio
+        seconds and CPU seconds.
+    """
+    def __init__(self, buckets=DEFAULT_BUCKETS, sinks=()):
+        self.buckets = buckets
+        self.sinks = list(sinks)
+        self.counters = defaultdict(int)
+        self.wall = {}
+        self.cpu = {}
+        # voice -> [audio seconds, cpu seconds]
+        self.voices = defaultdict(lambda: [0.0, 0.0])
+        self._lock = Lock()
+
+    def _histogram(self, table, stage):
+        histogram = table.get(stage)
+        if histogram is None:
+            histogram = table[stage] = Histogram(self.buckets)
+        return histogram
+
+    def record_stage(self, stage, wall, cpu):
+        with self._lock:
+            self._histogram(self.wall, stage).observe(wall)
+            self._histogram(self.cpu, stage).observe(cpu)
+
+    def record_synthesis(self, event):
+        with self._lock:
+            self.counters['utterances'] += 1
+            self.counters['samples'] += event['samples']
+            self.counters['bytes'] += event['bytes']
+            totals = self.voices[event['voice']]
+            totals[0] += event['audio_seconds']
+            totals[1] += event['cpu_seconds']
+        for sink in self.sinks:
+            sink(event)
+
+    def audio_per_cpu_second(self):
+        """
+            Audio seconds produced per CPU second, per voice.
+        """
+        return dict((voice, audio / cpu if cpu else 0.0)
+                    for voice, (audio, cpu) in self.voices.items())
+
+    def to_prometheus(self, prefix='pymimic'):
+        """
+            Metrics in the Prometheus text exposition format.
+        """
+        lines = []
+        with self._lock:
+            for name, value in sorted(self.counters.items()):
+                lines.append('# TYPE {}_{}_total counter'.format(prefix, name))
+                lines.append('{}_{}_total {}'.format(prefix, name, value))
+            for kind, table in (('wall', self.wall), ('cpu', self.cpu)):
+                metric = '{}_stage_{}_seconds'.format(prefix, kind)
+                lines.append('# TYPE {} histogram'.format(metric))
+                for stage, histogram in sorted(table.items()):
+                    for bound, count in histogram.cumulative():
+                        le = '+Inf' if bound == float('inf') else repr(bound)
+                        lines.append('{}_bucket{{stage="{}",le="{}"}} {}'
+                                     .format(metric, stage, le, count))
+                    lines.append('{}_sum{{stage="{}"}} {}'
+                                 .format(metric, stage, histogram.sum))
+                    lines.append('{}_count{{stage="{}"}} {}'
+                                 .format(metric, stage, histogram.count))
+            metric = '{}_audio_per_cpu_second'.format(prefix)
+            lines.append('# TYPE {} gauge'.format(metric))
+            for voice, ratio in sorted(self.audio_per_cpu_second().items()):
+                lines.append('{}{{voice="{}"}} {}'.format(metric, voice, ratio))
+        return '\n'.join(lines) + '\n'
+
+
+class LogSink():
+    """
+        Sink writing one JSON log line per synthesis.
+    """
+    def __init__(self, logger=None, level=logging.INFO):
+        self.logger = logger or logging.getLogger('pymimic.metrics')
+        self.level = level
+
+    def __call__(self, event):
+        self.logger.log(self.level, json.dumps(event, sort_keys=True))
+
+
+class StageTimer():
+    """
+        Times consecutive stages of one synthesis, see timer().
+    """
+    def __init__(self, metrics, voice):
+        self.metrics = metrics
+        self.voice = voice
+        self.stages = {}
+        self._wall = self._wall_start = time.perf_counter()
+        self._cpu = self._cpu_start = time.thread_time()
+
+    def mark(self, stage):
+        """
+            End the stage running since the previous mark.
+        """
+        wall = time.perf_counter()
+        cpu = time.thread_time()
+        self.stages[stage] = (wall - self._wall, cpu - self._cpu)
+        self.metrics.record_stage(stage, wall - self._wall, cpu - self._cpu)
+        self._wall = wall
+        self._cpu = cpu
+
+    def finish(self, samples=0, sample_rate=0, nbytes=0):
+        self.metrics.record_synthesis({
+            'voice': self.voice,
+            'stages': self.stages,
+            'samples': samples,
+            'bytes': nbytes,
+            'audio_seconds': samples / sample_rate if sample_rate else 0.0,
+            'wall_seconds': self._wall - self._wall_start,
+            'cpu_seconds': self._cpu - self._cpu_start,
+        })
+
+
+class _NullTimer():
+    def mark(self, stage):
+        pass
+
+    def finish(self, samples=0, sample_rate=0, nbytes=0):
+        pass
+
+
+_null_timer = _NullTimer()
+
+
+def enable(buckets=DEFAULT_BUCKETS, sinks=()):
+    global recorder
+    recorder = Metrics(buckets, sinks)
+    return recorder
+
+
+def disable():
+    global recorder
+    recorder = None
+
+
+def timer(voice):
+    if recorder is None:
+        return _null_timer
+    return StageTimer(recorder, voice)
+
+
+@contextmanager
+def stage(name):
+    """
+        Time a block of own processing, e.g. post-processing of audio.
+    """
+    if recorder is None:
+        yield
+        return
+    wall = time.perf_counter()
+    cpu = time.thread_time()
+    try:
+        yield
+    finally:
+        recorder.record_stage(name, time.perf_counter() - wall,
+                              time.thread_time() - cpu)
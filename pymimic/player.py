@@ -0,0 +1,284 @@
+from __future__ import absolute_import, division, print_function, \
+                       unicode_literals
+
+from threading import Condition, Thread
+import time
+
+try:
+    from queue import Queue
+except ImportError:
+    from Queue import Queue
+
+from .pymimic import Speak, synthesize_iter
+
+
+class NullSink():
+    """
+        Discards audio. With realtime set, write() takes as long as
+        playing the audio would, like a real device.
+    """
+    def __init__(self, realtime=False):
+        self.realtime = realtime
+        self.bytes_written = 0
+        self._bytes_per_second = None
+
+    def open(self, sample_rate, channels, sample_width):
+        self._bytes_per_second = sample_rate * channels * sample_width
+
+    def write(self, data):
+        self.bytes_written += len(data)
+        if self.realtime:
+            time.sleep(len(data) / self._bytes_per_second)
+
+    def close(self):
+        pass
+
+
+class FileSink():
+    """
+        Writes raw PCM to a file object.
+    """
+    def __init__(self, fileobj):
+        self.fileobj = fileobj
+
+    def open(self, sample_rate, channels, sample_width):
+        pass
+
+    def write(self, data):
+        self.fileobj.write(data)
+
+    def close(self):
+        self.fileobj.flush()
+
+
+class PyAudioSink():
+    """
+        Plays audio on the default output device (requires pyaudio).
+    """
+    def __init__(self):
+        self._pyaudio = None
+        self._stream = None
+
+    def open(self, sample_rate, channels, sample_width):
+        from pyaudio import PyAudio
+        self._pyaudio = PyAudio()
+        self._stream = self._pyaudio.open(
+            format=self._pyaudio.get_format_from_width(sample_width),
+            channels=channels, rate=sample_rate, output=True)
+
+    def write(self, data):
+        self._stream.write(bytes(data))
+
+    def close(self):
+        if self._stream is not None:
+            self._stream.stop_stream()
+            self._stream.close()
+            self._pyaudio.terminate()
+            self._stream = None
+
+
+class RingBuffer():
+    """
+        Fixed size byte ring buffer between one writer and one reader.
+
+        write() blocks while the buffer is full, read() returns what is
+        available up to the requested size.
+    """
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._buf = bytearray(capacity)
+        self._start = 0
+        self._size = 0
+        self._cond = Condition()
+
+    def __len__(self):
+        return self._size
+
+    def write(self, data):
+        """
+            Write all of data, returns how many times it had to wait for
+            the reader.
+        """
+        data = memoryview(data).cast('B')
+        waits = 0
+        with self._cond:
+            while len(data):
+                while self._size == self.capacity:
+                    waits += 1
+                    self._cond.wait()
+                end = (self._start + self._size) % self.capacity
+                n = min(len(data), self.capacity - self._size,
+                        self.capacity - end)
+                self._buf[end:end + n] = data[:n]
+                self._size += n
+                data = data[n:]
+                self._cond.notify_all()
+        return waits
+
+    def read(self, size, timeout=None):
+        """
+            Up to size bytes, waiting at most timeout for any to arrive.
+        """
+        with self._cond:
+            if self._size == 0:
+                self._cond.wait(timeout)
+            n = min(size, self._size, self.capacity - self._start)
+            data = bytes(self._buf[self._start:self._start + n])
+            self._start = (self._start + n) % self.capacity
+            self._size -= n
+            self._cond.notify_all()
+            return data
+
+
+class Player():
+    """
+        Speaks queued texts or Speak objects through a sink.
+
+        A synthesis thread renders the queue sentence by sentence into a
+        ring buffer holding buffer_seconds of audio, while a playback
+        thread feeds the sink from it in period_seconds blocks. So the
+        next item is synthesized while the current one plays. say() blocks
+        when max_queue items are waiting and synthesis blocks while the
+        ring buffer is full. When the sample rate or channel count changes
+        the audio before the change is played out and the sink is opened
+        again with the new format.
+
+        Counters: underruns (the sink starved while audio was still being
+        synthesized) and backpressure_waits (synthesis waited for space).
+        An exception raised synthesizing an item is kept in error and the
+        item is skipped.
+    """
+    def __init__(self, voice, sink=None, buffer_seconds=2.0,
+                 period_seconds=0.05, max_queue=8):
+        self.voice = voice
+        self.sink = sink if sink is not None else PyAudioSink()
+        self.buffer_seconds = buffer_seconds
+        self.period_seconds = period_seconds
+        self.underruns = 0
+        self.backpressure_waits = 0
+        self.items_synthesized = 0
+        self.error = None
+        self._queue = Queue(max_queue)
+        self._ring = None
+        self._period = None
+        self._format = None
+        self._pending = 0
+        # Bytes synthesized but not yet written by the sink, in the ring
+        # or in a sink.write() call
+        self._unplayed = 0
+        self._state = Condition()
+        self._closing = False
+        self._synth_thread = Thread(target=self._synthesize_loop)
+        self._synth_thread.daemon = True
+        self._play_thread = Thread(target=self._play_loop)
+        self._play_thread.daemon = True
+        self._synth_thread.start()
+        self._play_thread.start()
+
+    def say(self, item):
+        """
+            Queue a text or a synthesized Speak object.
+        """
+        with self._state:
+            self._pending += 1
+        self._queue.put(item)
+
+    def wait(self):
+        """
+            Block until everything queued has been played.
+        """
+        with self._state:
+            while self._pending or self._unplayed:
+                self._state.wait()
+
+    def close(self):
+        self.wait()
+        with self._state:
+            self._closing = True
+            self._state.notify_all()
+        self._queue.put(None)
+        self._synth_thread.join()
+        self._play_thread.join()
+        if self._ring is not None:
+            self.sink.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _open(self, sample_rate, channels):
+        sample_width = 2
+        if self._format is not None:
+            # Play out the old format before the sink changes
+            with self._state:
+                while self._unplayed:
+                    self._state.wait()
+            self.sink.close()
+        self._format = (sample_rate, channels)
+        self.sink.open(sample_rate, channels, sample_width)
+        frame = channels * sample_width
+        bytes_per_second = sample_rate * frame
+        # Whole frames only, so reads never split a sample at the wrap
+        period = int(bytes_per_second * self.period_seconds)
+        period = max(frame, period - period % frame)
+        capacity = int(bytes_per_second * self.buffer_seconds)
+        ring = RingBuffer(max(period, capacity - capacity % frame))
+        with self._state:
+            self._ring = ring
+            self._period = period
+            self._state.notify_all()
+
+    def _chunks(self, item):
+        if isinstance(item, Speak):
+            yield item.sample_rate, item.channels, item.buffer()
+        else:
+            for chunk in synthesize_iter(item, self.voice):
+                yield chunk.sample_rate, chunk.channels, chunk.data
+
+    def _synthesize_loop(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            try:
+                for sample_rate, channels, data in self._chunks(item):
+                    if self._format != (sample_rate, channels):
+                        self._open(sample_rate, channels)
+                    data = memoryview(data).cast('B')
+                    with self._state:
+                        self._unplayed += len(data)
+                    self.backpressure_waits += self._ring.write(data)
+                self.items_synthesized += 1
+            except Exception as e:
+                self.error = e
+            with self._state:
+                self._pending -= 1
+                self._state.notify_all()
+
+    def _play_loop(self):
+        with self._state:
+            while self._ring is None and not self._closing:
+                self._state.wait()
+        starved = False
+        while True:
+            with self._state:
+                ring, period = self._ring, self._period
+            if ring is None:
+                return
+            data = ring.read(period, self.period_seconds)
+            if data:
+                starved = False
+                self.sink.write(data)
+                with self._state:
+                    self._unplayed -= len(data)
+                    self._state.notify_all()
+                continue
+            with self._state:
+                if self._closing and not self._pending:
+                    return
+                if self._pending and not starved:
+                    self.underruns += 1
+                starved = bool(self._pending)
+                self._state.notify_all()
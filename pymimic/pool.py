@@ -0,0 +1,344 @@
+from __future__ import absolute_import, division, print_function, \
+                       unicode_literals
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import Pool, cpu_count, get_context
+from threading import Lock
+import gc
+import os
+
+from .pymimic import (Voice, Speak, SpeechChunk, lib_paths, load,
+                      _library_path)
+from .registry import voice_registry
+from .shm import export_speak, share_tracker
+
+
+# Per worker process state, set up once by _init_worker
+_worker_voice = None
+_worker_features = []
+_worker_error = None
+
+# Open SharedVoicePools, the collector stays frozen while there are any
+_frozen_pools = 0
+_frozen_lock = Lock()
+
+
+def _init_worker(voice_name, features, paths, library):
+    global _worker_voice
+    global _worker_features
+    global _worker_error
+    # Propagate custom search paths to workers that do not fork
+    lib_paths[:] = paths
+    try:
+        # The library of the parent, the search could find another one
+        load(path=library)
+        _worker_voice = voice_registry.acquire(voice_name)
+        _worker_features = features
+    except Exception as e:
+        # An exception in a pool initializer makes the pool respawn the
+        # worker forever, report it on the first task instead.
+        _worker_error = e
+
+
+def _chunk(speak, shared_memory):
+    if shared_memory:
+        return export_speak(speak)
+    return SpeechChunk.from_speak(speak)
+
+
+def _synthesize(text, shared_memory=False):
+    if _worker_error is not None:
+        raise _worker_error
+    with Speak(text, _worker_voice, _worker_features) as speak:
+        return _chunk(speak, shared_memory)
+
+
+def _result(async_result, shared_memory):
+    result = async_result.get()
+    return result.open() if shared_memory else result
+
+
+def _discard(pending, shared_memory):
+    """
+        Free the shared memory of results that will not be consumed.
+    """
+    if not shared_memory:
+        return
+    for async_result in pending:
+        try:
+            async_result.get().release()
+        except Exception:
+            pass
+
+
+def synthesize_many(texts, voice_name, workers=None, features=[],
+                    max_pending=None, shared_memory=False):
+    """
+        Synthesize texts in a pool of worker processes.
+
+        Each worker loads libttsmimiccore and the voice once. Results are
+        yielded as SpeechChunks in the order of texts. At most max_pending
+        (default two per worker) texts are queued or waiting to be
+        consumed, so a slow consumer stalls submission instead of letting
+        results pile up in memory.
+
+        With shared_memory the workers hand the audio over in shared
+        memory and shm.SharedChunks are yielded, which the caller has to
+        release().
+    """
+    workers = workers or cpu_count()
+    if max_pending is None:
+        max_pending = 2 * workers
+    max_pending = max(1, max_pending)
+    if shared_memory:
+        share_tracker()
+
+    pool = Pool(workers, initializer=_init_worker,
+                initargs=(voice_name, features, list(lib_paths),
+                          _library_path()))
+    pending = deque()
+    try:
+        for text in texts:
+            if len(pending) >= max_pending:
+                yield _result(pending.popleft(), shared_memory)
+            pending.append(pool.apply_async(_synthesize,
+                                            (text, shared_memory)))
+        while pending:
+            yield _result(pending.popleft(), shared_memory)
+        pool.close()
+    finally:
+        _discard(pending, shared_memory)
+        pool.terminate()
+        pool.join()
+
+
+class ThreadPoolSynthesizer():
+    """
+        Synthesize in a pool of threads inside this process.
+
+        ctypes releases the GIL around the native calls, so synthesis
+        scales over cores while the library and the voice are loaded only
+        once. voice is a Voice or a voice name, a name is acquired from
+        voice_registry until close(). The voice is shared by all threads
+        and never modified: features are applied to each utterance.
+    """
+    def __init__(self, voice, workers=None, features=[]):
+        load()
+        self.workers = workers or cpu_count()
+        self.features = list(features)
+        self._acquired = not isinstance(voice, Voice)
+        if self._acquired:
+            voice = voice_registry.acquire(voice)
+        self.voice = voice
+        self._executor = ThreadPoolExecutor(self.workers)
+
+    def _synthesize(self, text, features):
+        with Speak(text, self.voice, features) as speak:
+            return SpeechChunk.from_speak(speak)
+
+    def submit(self, text, features=None):
+        """
+            Future of the SpeechChunk for text.
+        """
+        if features is None:
+            features = self.features
+        return self._executor.submit(self._synthesize, text, features)
+
+    def map(self, texts, max_pending=None):
+        """
+            SpeechChunks for texts in order, with at most max_pending
+            (default two per thread) texts in flight.
+        """
+        if max_pending is None:
+            max_pending = 2 * self.workers
+        max_pending = max(1, max_pending)
+        pending = deque()
+        try:
+            for text in texts:
+                if len(pending) >= max_pending:
+                    yield pending.popleft().result()
+                pending.append(self.submit(text))
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        if self._acquired:
+            self._acquired = False
+            voice_registry.release(self.voice)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def process_memory(pid='self'):
+    """
+        Memory of a process in bytes from /proc (Linux): rss, pss, shared
+        (pages also mapped by other processes, e.g. copy-on-write voice
+        data inherited from a parent) and unique (private to the process).
+    """
+    fields = {}
+    path = '/proc/{}/smaps_rollup'.format(pid)
+    if not os.path.exists(path):
+        # Kernels before 4.14, sum up the mappings
+        path = '/proc/{}/smaps'.format(pid)
+    with open(path) as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                name = parts[0].rstrip(':')
+                fields[name] = fields.get(name, 0) + int(parts[1]) * 1024
+    return {
+        'rss': fields.get('Rss', 0),
+        'pss': fields.get('Pss', 0),
+        'shared': fields.get('Shared_Clean', 0) + fields.get('Shared_Dirty', 0),
+        'unique': (fields.get('Private_Clean', 0) +
+                   fields.get('Private_Dirty', 0)),
+    }
+
+
+def _synthesize_shared(text, voice_name, features, shared_memory):
+    # Held in the registry by the parent, found without loading
+    with voice_registry.voice(voice_name) as voice:
+        with Speak(text, voice, features) as speak:
+            return _chunk(speak, shared_memory)
+
+
+def _freeze_gc():
+    global _frozen_pools
+    with _frozen_lock:
+        gc.freeze()
+        _frozen_pools += 1
+
+
+def _unfreeze_gc():
+    global _frozen_pools
+    with _frozen_lock:
+        _frozen_pools -= 1
+        if _frozen_pools == 0:
+            gc.unfreeze()
+
+
+class SharedVoicePool():
+    """
+        Process pool sharing voices loaded once in the parent.
+
+        libttsmimiccore and the voices are loaded before the workers are
+        forked, so the voice data stays in pages shared copy-on-write
+        instead of being loaded again by every worker. Workers only read
+        the voices: features are applied per utterance. The first of
+        voices is the default, all are acquired from voice_registry until
+        close(). Requires the fork start method.
+
+        memory_usage() reports unique and shared memory of each worker,
+        the unique part is what every additional worker costs.
+
+        With shared_memory the audio comes back in shared memory as
+        shm.SharedChunks (SharedChunkRefs from submit()) to be released
+        by the caller.
+    """
+    def __init__(self, voices, workers=None, features=[],
+                 maxtasksperchild=None, shared_memory=False):
+        try:
+            context = get_context('fork')
+        except ValueError:
+            raise ValueError('SharedVoicePool requires fork')
+        load()
+        self.voices = list(voices)
+        self.workers = workers or cpu_count()
+        self.features = list(features)
+        self.shared_memory = shared_memory
+        self._pool = None
+        self._held = []
+        try:
+            for name in self.voices:
+                self._held.append(voice_registry.acquire(name))
+            if shared_memory:
+                share_tracker()
+            # Keep the collector from touching, and so copying, inherited
+            # objects in the workers. Workers replacing those that reached
+            # maxtasksperchild fork later, so it stays frozen until close()
+            _freeze_gc()
+            try:
+                self._pool = context.Pool(self.workers,
+                                          maxtasksperchild=maxtasksperchild)
+            except:
+                _unfreeze_gc()
+                raise
+        except:
+            self._release_voices()
+            raise
+
+    def submit(self, text, voice=None, features=None):
+        """
+            AsyncResult of the SpeechChunk (or SharedChunkRef) for text.
+        """
+        voice = voice or self.voices[0]
+        if voice not in self.voices:
+            raise ValueError("Voice {} is not loaded by the pool".format(voice))
+        if features is None:
+            features = self.features
+        return self._pool.apply_async(_synthesize_shared,
+                                      (text, voice, features,
+                                       self.shared_memory))
+
+    def map(self, texts, voice=None, max_pending=None):
+        """
+            SpeechChunks for texts in order, with at most max_pending
+            (default two per worker) texts in flight.
+        """
+        if max_pending is None:
+            max_pending = 2 * self.workers
+        max_pending = max(1, max_pending)
+        pending = deque()
+        try:
+            for text in texts:
+                if len(pending) >= max_pending:
+                    yield _result(pending.popleft(), self.shared_memory)
+                pending.append(self.submit(text, voice))
+            while pending:
+                yield _result(pending.popleft(), self.shared_memory)
+        finally:
+            _discard(pending, self.shared_memory)
+
+    def memory_usage(self):
+        """
+            process_memory() of the parent and of each worker by pid.
+        """
+        # Pool keeps its worker processes in _pool
+        pids = [p.pid for p in self._pool._pool if p.is_alive()]
+        workers = {}
+        for pid in pids:
+            try:
+                workers[pid] = process_memory(pid)
+            except (IOError, OSError):
+                # Recycled in the meantime
+                pass
+        return {'parent': process_memory(), 'workers': workers}
+
+    def _release_voices(self):
+        while self._held:
+            voice_registry.release(self._held.pop())
+
+    def close(self):
+        if self._pool is None:
+            return
+        self._pool.close()
+        self._pool.terminate()
+        self._pool.join()
+        self._pool = None
+        _unfreeze_gc()
+        self._release_voices()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -3,9 +3,20 @@ from __future__ import absolute_import, division, print_function, \
 
 from ctypes import *
 from ctypes.util import find_library
-import struct
 
+from array import array
+from functools import wraps
+from io import BytesIO
+from threading import Lock, RLock
+import json
 import os
+import re
+import sys
+import tempfile
+import weakref
+
+from . import metrics
+from .audio import ENCODINGS, write_audio, _require_numpy
 
 
 mimic_lib = None
@@ -14,6 +25,16 @@ venv = os.environ.get('VIRTUAL_ENV', '')
 lib_paths = ['.', venv + '/lib/', venv + '/usr/lib/']
 
 feature_setter = {}
+_load_lock = RLock()
+
+# Chunk boundaries for streaming synthesis: end of sentence punctuation or a
+# blank line. Clause mode also breaks after commas, colons and semicolons.
+_sentence_re = re.compile(r'(?<=[.!?])\s+|\n\s*\n')
+_clause_re = re.compile(r'(?<=[.!?,;:])\s+|\n\s*\n')
+
+# Native objects owned by pymimic and not yet freed, see live_objects()
+_live = {'voices': 0, 'utterances': 0, 'waves': 0}
+_live_lock = Lock()
 
 def _find_shared_library(libname, lib_paths):
     # We first search using the standard find_library
@@ -28,49 +49,175 @@ def _find_shared_library(libname, lib_paths):
     return None
 
 
-def require_libmimic(func):
-    def inner(*args, **kwargs):
-        global mimic_lib
-        global feature_setter
-
+def _cache_dir():
+    """ Base directory of pymimic's caches: PYMIMIC_CACHE_DIR, else
+    XDG_CACHE_HOME/pymimic or ~/.cache/pymimic """
+    cache_dir = os.environ.get('PYMIMIC_CACHE_DIR')
+    if not cache_dir:
+        cache_home = (os.environ.get('XDG_CACHE_HOME') or
+                      os.path.join(os.path.expanduser('~'), '.cache'))
+        cache_dir = os.path.join(cache_home, 'pymimic')
+    return cache_dir
+
+
+def _library_cache_file():
+    return os.path.join(_cache_dir(), 'libraries.json')
+
+
+def _read_library_cache():
+    try:
+        with open(_library_cache_file()) as f:
+            return json.load(f)
+    except (IOError, OSError, ValueError):
+        return {}
+
+
+def _write_library_cache(cache):
+    # Best effort, a read-only home must not break loading
+    cache_file = _library_cache_file()
+    try:
+        os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(cache_file))
+        with os.fdopen(fd, 'w') as f:
+            json.dump(cache, f)
+        os.replace(tmp_path, cache_file)
+    except (IOError, OSError):
+        pass
+
+
+def _open_library(libname, lib_paths):
+    """
+        CDLL for libname, using the path found by a previous process for
+        the same search paths when it still loads.
+    """
+    # Relative search paths like '.' depend on the working directory
+    key = json.dumps([libname, [os.path.abspath(p) for p in lib_paths]])
+    cache = _read_library_cache()
+    cached = cache.get(key)
+    # Bare sonames from find_library are resolved by the dynamic loader
+    if cached is not None and (os.sep not in cached or
+                               os.path.isfile(cached)):
+        try:
+            return CDLL(cached)
+        except OSError:
+            pass
+    lib_fn = _find_shared_library(libname, lib_paths)
+    if lib_fn is None:
+        raise OSError("File lib{}.so not found on paths".format(libname),
+                      lib_paths)
+    if os.sep in lib_fn:
+        lib_fn = os.path.abspath(lib_fn)
+    lib = CDLL(lib_fn)
+    if lib_fn != cached:
+        cache[key] = lib_fn
+        _write_library_cache(cache)
+    return lib
+
+
+def _library_path():
+    """ Path of the loaded libttsmimiccore, None before load() """
+    return mimic_lib._name if mimic_lib is not None else None
+
+
+def load(path=None, preload_voices=[]):
+    """
+        Load libttsmimiccore and declare all function prototypes.
+
+        Called on first use if not called explicitly. path overrides the
+        library search, preload_voices are loaded into the voice registry.
+        Safe to call from several threads, the library is initialized once.
+    """
+    global mimic_lib
+    global feature_setter
+
+    with _load_lock:
         if mimic_lib is None:
-            mimic_lib_fn = _find_shared_library('ttsmimiccore', lib_paths)
-            if mimic_lib_fn is None:
-                raise OSError("File libttsmimiccore.so not found on paths", lib_paths)
-            mimic_lib = CDLL(mimic_lib_fn)
-
-            # declare function return types
-            mimic_lib.mimic_text_to_wave.restype = POINTER(_MimicWave)
-            mimic_lib.utt_wave.restype = POINTER(_MimicWave)
-            mimic_lib.copy_wave.restype = POINTER(_MimicWave)
-            mimic_lib.new_utterance.restype = POINTER(_MimicUtterance)
-            mimic_lib.mimic_voice_load.restype = POINTER(_MimicVoice)
-            mimic_lib.mimic_voice_select.restype = POINTER(_MimicVoice)
-            mimic_lib.item_feat_float.restype = c_float
-            mimic_lib.item_feat_float.argtypes = [c_void_p, c_char_p]
-            mimic_lib.item_feat_string.restype = c_char_p
-            mimic_lib.item_feat_string.argtypes = [c_void_p, c_char_p]
-            mimic_lib.feat_set_float.argtypes = [POINTER(_MimicFeature), c_char_p, c_float]
-            mimic_lib.utt_relation.restype = POINTER(_MimicRelation)
-            mimic_lib.relation_head.restype = c_void_p
-            mimic_lib.relation_head.argtypes = [POINTER(_MimicRelation)]
-            mimic_lib.item_next.restype = c_void_p
-            mimic_lib.item_next.argtypes = [c_void_p]
-            mimic_lib.new_features.restype = POINTER(_MimicFeature)
-            mimic_lib.mimic_play_wave.argtypes = [POINTER(_MimicWave)]
-            mimic_lib.cst_wave_save_riff.argtypes = [POINTER(_MimicWave),
-                                                    c_char_p]
+            if path is not None:
+                lib = CDLL(path)
+            else:
+                lib = _open_library('ttsmimiccore', lib_paths)
+            for name, restype, argtypes in _prototypes:
+                try:
+                    func = getattr(lib, name)
+                except AttributeError:
+                    # Left to fail on use, older libraries lack optional parts
+                    continue
+                func.restype = restype
+                func.argtypes = argtypes
             feature_setter = {
-                float: mimic_lib.feat_set_float,
-                str: mimic_lib.feat_set_string,
-                int: mimic_lib.feat_set_int
+                float: lib.feat_set_float,
+                int: lib.feat_set_int,
+                bytes: lib.feat_set_string,
+                str: lib.feat_set_string
             }
+            lib.mimic_core_init()
+            # Published last, require_libmimic checks it without the lock
+            mimic_lib = lib
+
+        if preload_voices:
+            from .registry import voice_registry
+            voice_registry.preload(preload_voices)
+    return mimic_lib
 
-            mimic_lib.mimic_core_init()
+
+def require_libmimic(func):
+    @wraps(func)
+    def inner(*args, **kwargs):
+        if mimic_lib is None:
+            load()
         return func(*args, **kwargs)
     return inner
 
 
+def _track(kind, delta):
+    with _live_lock:
+        _live[kind] += delta
+
+
+def live_objects():
+    """
+        Counts of open Voices and of native utterances and waves created
+        through pymimic that have not been freed yet, for leak checks.
+    """
+    with _live_lock:
+        return dict(_live)
+
+
+def _encode(value):
+    if isinstance(value, str):
+        return value.encode('utf-8')
+    return value
+
+
+def _decode(value):
+    if isinstance(value, bytes):
+        return value.decode('utf-8')
+    return value
+
+
+# flite keeps the name pointer of a feature without copying it, the encoded
+# names must live as long as the process
+_feature_names = {}
+
+
+def _intern_name(name):
+    encoded = _feature_names.get(name)
+    if encoded is None:
+        encoded = _feature_names.setdefault(name, _encode(name))
+    return encoded
+
+
+def _set_features(target, features):
+    f = mimic_lib.new_features()
+    try:
+        for name, val in features:
+            feature_setter[type(val)](f, _intern_name(name), _encode(val))
+        mimic_lib.feat_copy_into(f, target)
+    finally:
+        # The values are reference counted, target keeps its own
+        mimic_lib.delete_features(f)
+
+
 class _MimicVal(Structure):
     pass
 
@@ -120,9 +267,29 @@ class _MimicWave(Structure):
         ('samples', POINTER(c_short)),
     ]
 
-    def __str__(self):
-        sample_list = [self.samples[i] for i in range(self.num_samples)]
-        return struct.pack('%sh' % len(sample_list), *sample_list)
+    @property
+    def nbytes(self):
+        return self.num_samples * sizeof(c_short)
+
+    def as_array(self):
+        """
+            ctypes array over the native samples, without copying.
+
+            The array does not keep the wave alive, callers must hold a
+            reference to the owner of the wave while using it.
+        """
+        if self.num_samples == 0:
+            return (c_short * 0)()
+        return (c_short * self.num_samples).from_address(
+            addressof(self.samples.contents))
+
+    def tobytes(self):
+        if self.num_samples == 0:
+            return b''
+        return string_at(self.samples, self.nbytes)
+
+    def __bytes__(self):
+        return self.tobytes()
 
 
 class _MimicRelation(Structure):
@@ -133,6 +300,59 @@ class _MimicRelation(Structure):
         ('tail', c_void_p)
     ]
 
+# Signature of the synthesis stage hooks (cst_uttfunc)
+_UttFunc = CFUNCTYPE(c_void_p, c_void_p)
+
+# Installed in place of the hooks skipped by Utterance(until=...)
+_skip_stage = _UttFunc(lambda utterance: utterance)
+
+# Synthesis hooks that run after each stage accepted as until
+_later_hooks = {
+    'Segment': (b'f0_model_func', b'wave_synth_func', b'post_synth_hook_func')
+}
+
+
+_Utt = POINTER(_MimicUtterance)
+_Feat = POINTER(_MimicFeature)
+_Wave = POINTER(_MimicWave)
+
+# Prototypes of the libttsmimiccore functions used, applied once by load()
+_prototypes = [
+    ('mimic_core_init', c_int, []),
+    ('mimic_voice_select', POINTER(_MimicVoice), [c_char_p]),
+    ('mimic_voice_load', POINTER(_MimicVoice), [c_char_p]),
+    ('delete_voice', None, [POINTER(_MimicVoice)]),
+    ('mimic_text_to_wave', _Wave, [c_char_p, POINTER(_MimicVoice)]),
+    ('new_utterance', _Utt, []),
+    ('delete_utterance', None, [_Utt]),
+    ('utt_set_input_text', None, [_Utt, c_char_p]),
+    ('utt_init', _Utt, [_Utt, POINTER(_MimicVoice)]),
+    ('utt_synth', _Utt, [_Utt]),
+    ('utt_wave', _Wave, [_Utt]),
+    ('utt_relation', POINTER(_MimicRelation), [_Utt, c_char_p]),
+    ('relation_head', c_void_p, [POINTER(_MimicRelation)]),
+    ('item_next', c_void_p, [c_void_p]),
+    ('item_feat_string', c_char_p, [c_void_p, c_char_p]),
+    ('item_feat_float', c_float, [c_void_p, c_char_p]),
+    ('item_feat_int', c_int, [c_void_p, c_char_p]),
+    ('ffeature_string', c_char_p, [c_void_p, c_char_p]),
+    ('ffeature_float', c_float, [c_void_p, c_char_p]),
+    ('ffeature_int', c_int, [c_void_p, c_char_p]),
+    ('new_features', _Feat, []),
+    ('delete_features', None, [_Feat]),
+    ('feat_copy_into', c_int, [_Feat, _Feat]),
+    ('feat_set', None, [_Feat, c_char_p, POINTER(_MimicVal)]),
+    ('feat_set_int', None, [_Feat, c_char_p, c_int]),
+    ('feat_set_float', None, [_Feat, c_char_p, c_float]),
+    ('feat_set_string', None, [_Feat, c_char_p, c_char_p]),
+    ('uttfunc_val', POINTER(_MimicVal), [_UttFunc]),
+    ('copy_wave', _Wave, [_Wave]),
+    ('delete_wave', None, [_Wave]),
+    ('mimic_play_wave', c_int, [_Wave]),
+    ('cst_wave_save_riff', c_int, [_Wave, c_char_p]),
+]
+
+
 class UtterancePhones():
     @require_libmimic
     def __init__(self, utterance):
@@ -157,20 +377,133 @@ class UtterancePhones():
         return (string, endtime)
 
 
+# Steps of a flite feature path, e.g. R:SylStructure.parent.name
+_path_step = re.compile(r'(n|p|nn|pp|parent|daughter[12n]?|first|last|'
+                        r'R:[A-Za-z_]\w*)$')
+_feature_name = re.compile(r'[A-Za-z_][\w-]*$')
+
+# Paths to the start and end of the items of relations with timings, only
+# segments have an end in flite
+_time_paths = {
+    'Segment': ('p.end', 'end'),
+    'Syllable': ('R:SylStructure.daughter1.R:Segment.p.end',
+                 'R:SylStructure.daughtern.end'),
+    'Word': ('R:SylStructure.daughter1.daughter1.R:Segment.p.end',
+             'R:SylStructure.daughtern.daughtern.end'),
+}
+
+
+def _column_spec(feature):
+    if isinstance(feature, tuple):
+        name, kind = feature
+    else:
+        name = feature
+        kind = str if feature.endswith('name') else float
+    if kind not in (str, int, float):
+        raise ValueError("Unsupported type {!r} for {}".format(kind, name))
+    steps = name.split('.')
+    if (not _feature_name.match(steps[-1]) or
+            not all(_path_step.match(step) for step in steps[:-1])):
+        raise ValueError("Invalid feature path {!r}".format(name))
+    return (name, kind)
+
+
+def _read_relation(utterance, relation, features, use_numpy):
+    specs = [_column_spec(f) for f in features]
+    time_paths = _time_paths.get(relation)
+    derived = [name for name, _ in specs if name in ('start', 'end', 'dur')]
+    if time_paths is None:
+        if 'start' in derived or 'dur' in derived:
+            raise ValueError("No item timings in the {} relation".format(
+                relation))
+        derived = []
+    # Read through ffeature, which gives 0 for a missing feature where
+    # item_feat would end the process
+    read_specs = [(name, kind) for name, kind in specs if name not in derived]
+    if derived:
+        read_specs += [(path, float) for path in time_paths]
+
+    columns = {}
+    readers = []
+    for name, kind in read_specs:
+        if kind is str:
+            values = []
+            getter = mimic_lib.ffeature_string
+        elif kind is int:
+            values = array('i')
+            getter = mimic_lib.ffeature_int
+        else:
+            values = array('f')
+            getter = mimic_lib.ffeature_float
+        columns[name] = values
+        readers.append((values.append, getter, name.encode('utf-8'),
+                        kind is str))
+
+    rel = mimic_lib.utt_relation(utterance, relation.encode('utf-8'))
+    item = mimic_lib.relation_head(rel) if rel else None
+    item_next = mimic_lib.item_next
+    intern = sys.intern
+    while item:
+        for append, getter, name, is_str in readers:
+            value = getter(item, name)
+            append(intern(value.decode('utf-8')) if is_str else value)
+        item = item_next(item)
+
+    if derived:
+        starts, ends = (columns[path] for path in time_paths)
+        columns['start'] = starts
+        columns['end'] = ends
+        columns['dur'] = array('f', [e - s for e, s in zip(ends, starts)])
+
+    table = {}
+    for name, _ in specs:
+        values = columns[name]
+        if use_numpy and isinstance(values, array):
+            numpy = _require_numpy('use_numpy')
+            dtype = numpy.float32 if values.typecode == 'f' else numpy.intc
+            values = numpy.frombuffer(values, dtype=dtype)
+        table[name] = values
+    return table
+
+
 class Utterance():
     @require_libmimic
-    def __init__(self, text, voice, features=[]):
+    def __init__(self, text, voice, features=[], until=None, timer=None):
+        """
+            Synthesize text with voice.
+
+            until='Segment' stops after segment and duration prediction,
+            the phoneme timings are available but no wave is generated.
+            features are set on the utterance before synthesis, overriding
+            the voice's for this call only. A metrics timer passed in is
+            left for the caller to finish.
+        """
+        # Set before anything can raise, __del__ checks it
+        self.pointer = None
+        if until is not None and until not in _later_hooks:
+            raise ValueError("Can not stop synthesis at {}".format(until))
+        own_timer = timer is None
+        if own_timer:
+            timer = metrics.timer(voice.name)
+        self._relation_tables = {}
         self.pointer = mimic_lib.new_utterance()
+        _track('utterances', 1)
         mimic_lib.utt_set_input_text(self.pointer, text)
         mimic_lib.utt_init(self.pointer, voice.pointer)
-        mimic_lib.utt_synth(self.pointer)
+        timer.mark('utt_init')
+        if until is not None:
+            # Hooks set on the utterance take precedence over the voice's
+            for hook in _later_hooks[until]:
+                mimic_lib.feat_set(self.pointer.contents.features, hook,
+                                   mimic_lib.uttfunc_val(_skip_stage))
         self.set_features(features)
+        mimic_lib.utt_synth(self.pointer)
+        timer.mark('utt_synth')
+        if own_timer:
+            timer.finish()
 
     def set_features(self, features):
-        f = mimic_lib.new_features()
-        for name, val in features:
-            feature_setter[type(val)](f, name, val)
-        mimic_lib.feat_copy_into(f, self.pointer.contents.features)
+        _set_features(self.pointer.contents.features, features)
 
     @property
     def features(self):
@@ -181,23 +514,78 @@ class Utterance():
         u = UtterancePhones(self.pointer)
         return [phone for phone in u]
 
+    def relation_table(self, relation, features, use_numpy=False):
+        """
+            Columns of item features in relation, read in a single pass.
+
+            features are feature names or paths (e.g.
+            'R:SylStructure.parent.name') or (name, type) pairs with type
+            str, int or float. Plain names ending in 'name' are read as
+            strings, other plain names as floats. A missing feature reads
+            as 0. 'start', 'end' and 'dur' of Segment, Syllable and Word
+            items come from their segments, other relations have no
+            'start' or 'dur'.
+
+            Returns a dict of feature name to column: a list of interned
+            strings, or an array('i')/array('f') (a NumPy view of it if
+            use_numpy is set). Tables are cached on the utterance.
+        """
+        if use_numpy:
+            _require_numpy('use_numpy')
+        key = (relation, tuple(features), use_numpy)
+        table = self._relation_tables.get(key)
+        if table is None:
+            table = _read_relation(self.pointer, relation, features,
+                                   use_numpy)
+            self._relation_tables[key] = table
+        return table
+
+    def close(self):
+        """
+            Free the native utterance, including its wave.
+        """
+        if self.pointer:
+            mimic_lib.delete_utterance(self.pointer)
+            self.pointer = None
+            _track('utterances', -1)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
     def __del__(self):
-        mimic_lib.delete_utterance(self.pointer)
+        self.close()
+
+# Features applied to each native voice by address, wrappers of the same
+# library voice share them
+_voice_feature_values = {}
+
 
 class Voice():
     @require_libmimic
     def __init__(self, name, features=[]):
         self.pointer = mimic_lib.mimic_voice_select(name.encode('utf-8'))
         self.name = name
-        if self.pointer == 0:
+        if not self.pointer:
             raise ValueError("Voice with name {} could not be loaded".format(name))
+        _track('voices', 1)
+        # Features set on the native voice through any wrapper of it,
+        # name -> value
+        self.feature_values = _voice_feature_values.setdefault(
+            addressof(self.pointer.contents), {})
         self.set_features(features)
 
     def set_features(self, features):
-        f = mimic_lib.new_features()
+        """
+            Change the voice's features. Not safe while other threads
+            synthesize with the voice, pass per call features to
+            Speak/Utterance instead.
+        """
+        _set_features(self.pointer.contents.features, features)
         for name, val in features:
-            feature_setter[type(val)](f, name, val)
-        mimic_lib.feat_copy_into(f, self.pointer.contents.features)
+            self.feature_values[_decode(name)] = _decode(val)
 
     @property
     def features(self):
@@ -206,21 +594,171 @@ class Voice():
     def __str__(self):
         return 'Voice: ' + self.name
 
+    def close(self):
+        if self.pointer:
+            # mimic_voice_select returns the voice kept in the library's
+            # voice list, the same one for every wrapper of a name. It is
+            # never deleted, only the reference is dropped.
+            self.pointer = None
+            _track('voices', -1)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
     def __del__(self):
-        mimic_lib.delete_voice(self.pointer)
+        self.close()
+
+
+class _OwnedWave():
+    """
+        A copied wave that outlives its utterance.
+    """
+    def __init__(self, wave):
+        self.pointer = mimic_lib.copy_wave(wave)
+        _track('waves', 1)
+
+    def close(self):
+        if self.pointer:
+            mimic_lib.delete_wave(self.pointer)
+            self.pointer = None
+            _track('waves', -1)
+
+    def __del__(self):
+        self.close()
+
+
+class _SampleViews():
+    """
+        Count of the live buffer() and array() views of a Speak. The owner
+        of the native samples is closed once the Speak is closed and the
+        last view is released.
+    """
+    def __init__(self, owner):
+        self.owner = owner
+        self.count = 0
+        self.closed = False
+        self._lock = Lock()
+
+    def add(self, base):
+        """ Count a view until base, the object it exports, is released """
+        with self._lock:
+            self.count += 1
+        weakref.finalize(base, self._release)
+
+    def _release(self):
+        with self._lock:
+            self.count -= 1
+        self._close_unused()
+
+    def close(self):
+        with self._lock:
+            self.closed = True
+        self._close_unused()
+
+    def _close_unused(self):
+        with self._lock:
+            if not self.closed or self.count or self.owner is None:
+                return
+            owner, self.owner = self.owner, None
+        owner.close()
 
 
 class Speak():
     @require_libmimic
-    def __init__(self, text, voice):
-        self.utterance = Utterance(text.encode('utf-8'), voice)
+    def __init__(self, text, voice, features=[], keep='utterance'):
+        """
+            Synthesize text with voice.
+
+            keep selects what stays in memory after synthesis: the whole
+            'utterance' (phonemes and relations available), only the
+            'wave' or only the 'pcm' data as bytes.
+
+            The native memory is freed by close(), at the end of a with
+            block or when the object is garbage collected. Views from
+            buffer() or array() stay valid after close(), the memory is
+            then freed when the last of them is released.
+        """
+        if keep not in ('utterance', 'wave', 'pcm'):
+            raise ValueError("Unknown keep option {}".format(keep))
+        self.text = text
+        timer = metrics.timer(voice.name)
+        self.utterance = Utterance(text.encode('utf-8'), voice, features,
+                                   timer=timer)
         self.mimic_wave = mimic_lib.utt_wave(self.utterance.pointer)
+        timer.mark('utt_wave')
         self.string = None
         self._char_pointer = None
+        self._array = None
+        self._views = None
+        self._owner = self.utterance
+        wave = self.mimic_wave.contents
+        self._sample_rate = wave.sample_rate // self.sample_size
+        self._channels = wave.num_channels
+        self._num_samples = wave.num_samples
+        if metrics.recorder is not None:
+            timer.finish(self._num_samples, self._sample_rate, wave.nbytes)
+        if keep == 'wave':
+            self._owner = _OwnedWave(self.mimic_wave)
+            self.mimic_wave = self._owner.pointer
+            self._release_utterance()
+        elif keep == 'pcm':
+            self.string = wave.tobytes()
+            self.mimic_wave = None
+            self._owner = None
+            self._release_utterance()
+
+    def _release_utterance(self):
+        if self.utterance is not None:
+            self.utterance.close()
+            self.utterance = None
+
+    def close(self):
+        """
+            Free the native utterance and wave now, or when the last view
+            from buffer() or array() is released if there are any. PCM
+            data already copied by bin() stays available.
+        """
+        self._array = None
+        self.mimic_wave = None
+        self._char_pointer = None
+        views, self._views = self._views, None
+        if views is not None:
+            # views closes the owner now or after the last view is released
+            self.utterance = None
+            self._owner = None
+            views.close()
+            return
+        self._release_utterance()
+        if self._owner is not None:
+            self._owner.close()
+            self._owner = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _kept_utterance(self):
+        if self.utterance is None:
+            raise ValueError('The utterance was not kept or is closed')
+        return self.utterance
+
+    def _kept_wave(self):
+        if not self.mimic_wave:
+            raise ValueError('The wave was not kept or is closed')
+        return self.mimic_wave
 
     @property
     def phonemes(self):
-        return self.utterance.phonemes
+        return self._kept_utterance().phonemes
+
+    def relation_table(self, relation, features, use_numpy=False):
+        return self._kept_utterance().relation_table(relation, features,
+                                                     use_numpy)
 
     @property
     def char_pointer(self):
@@ -228,19 +766,66 @@ class Speak():
             self._char_pointer = cast(self.samples, POINTER(c_char))
         return self._char_pointer
 
-    def __getslice__(self, start, stop):
-        return self.char_pointer[start:stop]
+    def __getitem__(self, key):
+        """
+            Byte access to the PCM data, slices return bytes.
+        """
+        # Not handed out, no need to count it as a view
+        data = memoryview(self._samples_array()).cast('B')
+        if isinstance(key, slice):
+            return data[key].tobytes()
+        return data[key]
+
+    def _samples_array(self):
+        if self._array is None:
+            if not self.mimic_wave and self.string is not None:
+                return memoryview(self.string).cast('h')
+            self._array = self._kept_wave().contents.as_array()
+            # Keep the owner of the wave (utterance or copy) alive as long
+            # as any view created from the array exists.
+            self._array._owner = self._owner
+        return self._array
+
+    def _view_base(self):
+        samples = self._samples_array()
+        if isinstance(samples, memoryview):
+            # A view of the bytes kept with keep='pcm'
+            return samples
+        if self._views is None:
+            self._views = _SampleViews(self._owner)
+        # An array per view, released with the view and all views of it
+        base = type(samples).from_buffer(samples)
+        self._views.add(base)
+        return base
+
+    def buffer(self):
+        """
+            Zero-copy memoryview of the PCM data as unsigned bytes.
+
+            The view stays valid as long as it is referenced.
+        """
+        return memoryview(self._view_base()).cast('B')
+
+    def __buffer__(self, flags):
+        return self.buffer()
+
+    def array(self):
+        """
+            Zero-copy NumPy int16 view of the samples (requires numpy).
+        """
+        numpy = _require_numpy('Speak.array()')
+        return numpy.frombuffer(self._view_base(), dtype=numpy.int16)
 
     @property
     def sample_rate(self):
         """
             Sample rate in samples per second
         """
-        return self.mimic_wave.contents.sample_rate // self.sample_size
+        return self._sample_rate
 
     @property
     def channels(self):
-        return self.mimic_wave.contents.num_channels
+        return self._channels
 
     @property
     def sample_size(self):
@@ -248,23 +833,142 @@ class Speak():
 
     @property
     def num_samples(self):
-        return self.mimic_wave.contents.num_samples
+        return self._num_samples
 
     @property
     def samples(self):
-        return self.mimic_wave.contents.samples
+        return self._kept_wave().contents.samples
 
     def bin(self):
         if self.string is None:
-            samples = cast(self.samples, POINTER(c_char))
-            self.string = b""
-            for i in range(self.num_samples * self.sample_size):
-                self.string = self.string + samples[i]
+            self.string = self._kept_wave().contents.tobytes()
         return self.string
 
     def play(self):
-        mimic_lib.mimic_play_wave(self.mimic_wave)
+        mimic_lib.mimic_play_wave(self._kept_wave())
 
     def write(self, file_path):
-        mimic_lib.cst_wave_save_riff(self.mimic_wave, file_path)
+        mimic_lib.cst_wave_save_riff(self._kept_wave(), _encode(file_path))
+
+    def write_to(self, fileobj, format='wav'):
+        """
+            Write the audio to a writable file object, e.g. a socket file,
+            BytesIO or pipe, straight from the native sample buffer.
+            format is 'wav' or 'raw' (headerless PCM).
+        """
+        write_audio(fileobj, self.buffer(), self.sample_rate, self.channels,
+                    format)
+
+    def to_wav_bytes(self):
+        f = BytesIO()
+        self.write_to(f)
+        return f.getvalue()
+
+    def convert(self, output_format):
+        """
+            Audio data resampled and encoded as given by an
+            audio.OutputFormat.
+        """
+        with metrics.stage('convert'):
+            converter = output_format.converter(self.sample_rate)
+            return converter.process(self.array()) + converter.flush()
+
+    @classmethod
+    def stream(cls, text, voice, clauses=False, output_format=None):
+        """
+            Synthesize text chunk by chunk, see synthesize_iter.
+        """
+        return synthesize_iter(text, voice, clauses, output_format)
+
+
+@require_libmimic
+def text_to_phonemes(text, voice, features=[]):
+    """
+        Phonemes and end times for text, without synthesizing audio.
+    """
+    return Utterance(text.encode('utf-8'), voice, features,
+                     until='Segment').phonemes
+
+
+class SpeechChunk():
+    """
+        PCM data and phoneme timings of one synthesized piece of text.
+
+        Phoneme end times are relative to the start of the chunk, start is
+        the offset of the chunk in seconds from the start of the stream.
+    """
+    def __init__(self, text, data, phonemes, sample_rate, channels, start,
+                 encoding='int16'):
+        self.text = text
+        self.data = data
+        self.phonemes = phonemes
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.start = start
+        self.encoding = encoding
+
+    @classmethod
+    def from_speak(cls, speak, start=0.0):
+        return cls(speak.text, speak.bin(), speak.phonemes,
+                   speak.sample_rate, speak.channels, start)
+
+    @property
+    def duration(self):
+        sample_width = ENCODINGS[self.encoding][0]
+        return len(self.data) / (sample_width * self.channels *
+                                 self.sample_rate)
+
+    def bin(self):
+        return self.data
+
+    def write_to(self, fileobj, format='wav'):
+        sample_width, format_tag = ENCODINGS[self.encoding]
+        write_audio(fileobj, self.data, self.sample_rate, self.channels,
+                    format, sample_width, format_tag)
+
+
+def split_text(text, clauses=False):
+    """
+        Split text into sentences (or clauses), skipping empty pieces.
+    """
+    pattern = _clause_re if clauses else _sentence_re
+    for piece in pattern.split(text):
+        piece = piece.strip()
+        if piece:
+            yield piece
+
+
+def synthesize_iter(text, voice, clauses=False, output_format=None):
+    """
+        Generator yielding a SpeechChunk per sentence (or clause) of text.
+
+        Each chunk is synthesized as its own utterance which is released
+        before the chunk is yielded, so memory use does not grow with the
+        length of the text.
+
+        With an audio.OutputFormat the chunks are converted as they are
+        produced, with resampler state carried across chunks. The samples
+        the resampler still holds at the end come in a last chunk without
+        text.
+    """
+    converter = None
+    start = 0.0
+    for piece in split_text(text, clauses):
+        speak = Speak(piece, voice)
+        chunk = SpeechChunk.from_speak(speak, start)
+        if output_format is not None:
+            if converter is None:
+                converter = output_format.converter(speak.sample_rate)
+            with metrics.stage('convert'):
+                chunk.data = converter.process(speak.array())
+            chunk.sample_rate = converter.sample_rate
+            chunk.encoding = converter.encoding
+        start += speak.num_samples / speak.sample_rate
+        speak.close()
+        yield chunk
+    if converter is not None:
+        tail = converter.flush()
+        if tail:
+            yield SpeechChunk('', tail, [], converter.sample_rate, 1, start,
+                              converter.encoding)
 
@@ -0,0 +1,148 @@
+from __future__ import absolute_import, division, print_function, \
+                       unicode_literals
+
+from collections import OrderedDict
+from contextlib import contextmanager
+from threading import RLock
+
+import os
+
+from .pymimic import Voice
+
+
+def _voice_size(key):
+    """
+        Estimated memory use of a voice, the size of the voice file.
+
+        Voices compiled into libttsmimiccore are counted as 0 bytes.
+    """
+    if os.path.isfile(key):
+        return os.path.getsize(key)
+    return 0
+
+
+class _VoiceEntry():
+    def __init__(self, voice, size):
+        self.voice = voice
+        self.size = size
+        self.refs = 0
+
+
+class VoiceRegistry():
+    """
+        Reference counted cache of loaded voices keyed by name or path.
+
+        acquire() returns the shared Voice for a name, loading it only the
+        first time, and release() gives it back. Voices that are no longer
+        referenced stay loaded until they are evicted, least recently used
+        first, when more than max_voices are loaded or the loaded voice
+        files exceed max_bytes. Voices in use are never evicted.
+
+        libttsmimiccore keeps every voice it loads in its own voice list
+        and never unloads it, eviction drops the Voice wrapper only.
+    """
+    def __init__(self, max_voices=None, max_bytes=None):
+        self.max_voices = max_voices
+        self.max_bytes = max_bytes
+        self.loads = 0
+        self.hits = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = RLock()
+
+    @staticmethod
+    def key(name):
+        if os.path.isfile(name):
+            return os.path.realpath(name)
+        return name
+
+    @property
+    def total_bytes(self):
+        return sum(entry.size for entry in self._entries.values())
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, name):
+        return self.key(name) in self._entries
+
+    def acquire(self, name):
+        key = self.key(name)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = _VoiceEntry(Voice(name), _voice_size(key))
+                # release() must not resolve the name again, a relative
+                # path may point elsewhere by then
+                entry.voice._registry_key = key
+                self._entries[key] = entry
+                self.loads += 1
+            else:
+                self.hits += 1
+            self._entries.move_to_end(key)
+            entry.refs += 1
+            self._evict()
+            return entry.voice
+
+    def release(self, voice):
+        key = getattr(voice, '_registry_key', None)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.voice is not voice:
+                raise ValueError("{} is not held by the registry".format(voice))
+            if entry.refs == 0:
+                raise ValueError("{} released more times than acquired".format(voice))
+            entry.refs -= 1
+            self._evict()
+
+    @contextmanager
+    def voice(self, name):
+        voice = self.acquire(name)
+        try:
+            yield voice
+        finally:
+            self.release(voice)
+
+    def preload(self, names):
+        """
+            Load voices ahead of use, e.g. at service startup.
+        """
+        for name in names:
+            self.release(self.acquire(name))
+
+    def clear(self):
+        """
+            Drop all voices that are not in use.
+        """
+        with self._lock:
+            for key, entry in list(self._entries.items()):
+                if entry.refs == 0:
+                    del self._entries[key]
+                    self.evictions += 1
+
+    def _over_budget(self):
+        if self.max_voices is not None and len(self._entries) > self.max_voices:
+            return True
+        if self.max_bytes is not None and self.total_bytes > self.max_bytes:
+            return True
+        return False
+
+    def _evict(self):
+        while self._over_budget():
+            for key, entry in self._entries.items():
+                if entry.refs == 0:
+                    break
+            else:
+                # Everything left is in use
+                return
+            # Only the wrapper is dropped, the native voice stays in the
+            # library's voice list and is found again by the next acquire.
+            del self._entries[key]
+            self.evictions += 1
+
+
+voice_registry = VoiceRegistry()
+
+
+def preload_voices(names):
+    voice_registry.preload(names)
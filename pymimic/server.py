@@ -0,0 +1,381 @@
+"""
+    Local synthesis server.
+
+        python -m pymimic.server --voice slt --port 8642
+        python -m pymimic.server --voice slt kal --unix /run/pymimic.sock
+
+    A pool of pre-forked worker processes keeps the voices loaded. Workers
+    are replaced after --max-requests syntheses to bound heap
+    fragmentation. Identical sentences (same voice, normalized text and
+    features) requested while one is already being synthesized share that
+    synthesis.
+
+    POST /synthesize with a JSON object:
+
+        {"text": "...", "voice": "slt", "features": [["name", value]],
+         "format": "wav" or "raw", "encoding": "int16", "sample_rate": 16000}
+
+    Only text is required. The audio is streamed back with chunked
+    transfer encoding sentence by sentence, the sample rate and encoding
+    are given in the X-Sample-Rate and X-Encoding headers.
+
+    GET /metrics returns queue depth, in-flight requests and latency
+    histograms in the Prometheus text format, GET /health returns ok.
+"""
+from __future__ import absolute_import, division, print_function, \
+                       unicode_literals
+
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from multiprocessing import Pool, cpu_count
+from threading import Lock
+import argparse
+import json
+import logging
+import os
+import signal
+import socket
+import socketserver
+import time
+
+from .audio import ENCODINGS, OutputFormat, WavStreamWriter
+from .cache import normalize_text
+from .metrics import Histogram
+from .pymimic import (SpeechChunk, Speak, lib_paths, load, split_text,
+                      _library_path)
+from .registry import VoiceRegistry, voice_registry
+
+LOG = logging.getLogger('pymimic.server')
+
+# Per worker process state, set up once by _init_worker
+_worker_error = None
+
+
+def _init_worker(voices, paths, library):
+    global _worker_error
+    # Shutdown is up to the parent, also when ^C reaches the process group
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    lib_paths[:] = paths
+    try:
+        # The library of the parent, see pool._init_worker
+        load(path=library)
+        voice_registry.preload(voices)
+    except Exception as e:
+        # Reported on the first task, see pool._init_worker
+        _worker_error = e
+
+
+def _synthesize(text, voice, features):
+    if _worker_error is not None:
+        raise _worker_error
+    with voice_registry.voice(voice) as v:
+        with Speak(text, v, features) as speak:
+            return SpeechChunk.from_speak(speak)
+
+
+class SynthesisService():
+    """
+        Worker pool for the server, usable on its own.
+
+        synthesize() yields the SpeechChunks of a text in order, keeping
+        up to max_pending sentences in the pool. Sentences already being
+        synthesized for another request are not submitted again.
+    """
+    def __init__(self, voices, workers=None, max_requests=None,
+                 max_pending=None):
+        self.voices = list(voices)
+        self.workers = workers or cpu_count()
+        self.max_pending = max_pending or 2 * self.workers
+        self.queue_depth = 0
+        self.active_requests = 0
+        self.syntheses = 0
+        self.coalesced = 0
+        self.errors = 0
+        self.synthesis_latency = Histogram()
+        self.first_chunk_latency = Histogram()
+        self.request_latency = Histogram()
+        self._inflight = {}
+        self._lock = Lock()
+        self._pool = Pool(self.workers, initializer=_init_worker,
+                          initargs=(self.voices, list(lib_paths),
+                                    _library_path()),
+                          maxtasksperchild=max_requests)
+
+    def submit(self, text, voice, features=[]):
+        """
+            AsyncResult of the SpeechChunk for one sentence.
+        """
+        features = [tuple(pair) for pair in features]
+        key = (VoiceRegistry.key(voice), normalize_text(text),
+               json.dumps(features))
+        start = time.perf_counter()
+
+        def done(value):
+            with self._lock:
+                self._inflight.pop(key, None)
+                self.queue_depth -= 1
+                self.syntheses += 1
+                if isinstance(value, Exception):
+                    self.errors += 1
+                self.synthesis_latency.observe(time.perf_counter() - start)
+
+        with self._lock:
+            result = self._inflight.get(key)
+            if result is not None:
+                self.coalesced += 1
+                return result
+            self.queue_depth += 1
+            # done() needs the lock, so it can not run before this is stored
+            result = self._pool.apply_async(_synthesize,
+                                            (text, voice, features),
+                                            callback=done,
+                                            error_callback=done)
+            self._inflight[key] = result
+        return result
+
+    def synthesize(self, text, voice=None, features=[]):
+        voice = voice or self.voices[0]
+        if voice not in self.voices:
+            raise ValueError("Voice {} is not served".format(voice))
+        start = time.perf_counter()
+        with self._lock:
+            self.active_requests += 1
+        try:
+            for i, chunk in enumerate(self._results(text, voice, features)):
+                if i == 0:
+                    self.first_chunk_latency.observe(
+                        time.perf_counter() - start)
+                yield chunk
+            self.request_latency.observe(time.perf_counter() - start)
+        finally:
+            with self._lock:
+                self.active_requests -= 1
+
+    def _results(self, text, voice, features):
+        pending = deque()
+        for piece in split_text(text):
+            if len(pending) >= self.max_pending:
+                yield pending.popleft().get()
+            pending.append(self.submit(piece, voice, features))
+        while pending:
+            yield pending.popleft().get()
+
+    def metrics_text(self, prefix='pymimic_server'):
+        """
+            Server metrics in the Prometheus text exposition format.
+        """
+        lines = []
+        with self._lock:
+            for name, kind, value in (
+                    ('queue_depth', 'gauge', self.queue_depth),
+                    ('active_requests', 'gauge', self.active_requests),
+                    ('workers', 'gauge', self.workers),
+                    ('syntheses_total', 'counter', self.syntheses),
+                    ('coalesced_total', 'counter', self.coalesced),
+                    ('errors_total', 'counter', self.errors)):
+                lines.append('# TYPE {}_{} {}'.format(prefix, name, kind))
+                lines.append('{}_{} {}'.format(prefix, name, value))
+            for name, histogram in (
+                    ('synthesis_seconds', self.synthesis_latency),
+                    ('first_chunk_seconds', self.first_chunk_latency),
+                    ('request_seconds', self.request_latency)):
+                metric = '{}_{}'.format(prefix, name)
+                lines.append('# TYPE {} histogram'.format(metric))
+                pairs, total, count = histogram.snapshot()
+                for bound, bucket in pairs:
+                    le = '+Inf' if bound == float('inf') else repr(bound)
+                    lines.append('{}_bucket{{le="{}"}} {}'.format(metric, le,
+                                                                  bucket))
+                lines.append('{}_sum {}'.format(metric, total))
+                lines.append('{}_count {}'.format(metric, count))
+        return '\n'.join(lines) + '\n'
+
+    def close(self):
+        self._pool.close()
+        self._pool.terminate()
+        self._pool.join()
+
+
+class _ChunkedWriter():
+    """
+        File object writing HTTP/1.1 chunked transfer encoding.
+    """
+    def __init__(self, wfile):
+        self.wfile = wfile
+
+    def write(self, data):
+        data = bytes(data)
+        if data:
+            self.wfile.write(b'%x\r\n' % len(data) + data + b'\r\n')
+
+    def close(self):
+        self.wfile.write(b'0\r\n\r\n')
+        self.wfile.flush()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        if self.path == '/metrics':
+            self._reply(200, self.server.service.metrics_text(),
+                        'text/plain; version=0.0.4')
+        elif self.path == '/health':
+            self._reply(200, 'ok\n', 'text/plain')
+        else:
+            self._reply(404, 'not found\n', 'text/plain')
+
+    def do_POST(self):
+        if self.path not in ('/', '/synthesize'):
+            self._reply(404, 'not found\n', 'text/plain')
+            return
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            request = json.loads(self.rfile.read(length).decode('utf-8'))
+            text = request['text']
+            audio_format = request.get('format', 'wav')
+            if audio_format not in ('wav', 'raw'):
+                raise ValueError("Unknown audio format {}".format(audio_format))
+            output_format = None
+            encoding = request.get('encoding', 'int16')
+            if request.get('sample_rate') or encoding != 'int16':
+                output_format = OutputFormat(request.get('sample_rate'),
+                                             encoding)
+            chunks = self.server.service.synthesize(
+                text, request.get('voice'), request.get('features', []))
+            first = next(chunks, None)
+        except (KeyError, ValueError, TypeError, ImportError) as e:
+            self._reply(400, json.dumps({'error': str(e)}) + '\n',
+                        'application/json')
+            return
+        except Exception as e:
+            LOG.exception('Synthesis failed')
+            self._reply(500, json.dumps({'error': str(e)}) + '\n',
+                        'application/json')
+            return
+        if first is None:
+            self._reply(400, json.dumps({'error': 'No text'}) + '\n',
+                        'application/json')
+            return
+        self._stream(first, chunks, audio_format, output_format)
+
+    def _stream(self, first, chunks, audio_format, output_format):
+        converter = None
+        sample_rate = first.sample_rate
+        encoding = 'int16'
+        if output_format is not None:
+            converter = output_format.converter(first.sample_rate)
+            sample_rate = converter.sample_rate
+            encoding = converter.encoding
+        sample_width, format_tag = ENCODINGS[encoding]
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'audio/wav' if audio_format == 'wav'
+                         else 'application/octet-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.send_header('X-Sample-Rate', str(sample_rate))
+        self.send_header('X-Encoding', encoding)
+        self.end_headers()
+
+        out = writer = _ChunkedWriter(self.wfile)
+        if audio_format == 'wav':
+            out = WavStreamWriter(writer, sample_rate, first.channels,
+                                  sample_width, format_tag)
+        chunk = first
+        try:
+            while chunk is not None:
+                data = chunk.data
+                if converter is not None:
+                    data = converter.process(data)
+                out.write(data)
+                chunk = next(chunks, None)
+            if converter is not None:
+                out.write(converter.flush())
+            writer.close()
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+        except Exception:
+            # Headers are out, all that is left is to cut the stream short
+            LOG.exception('Synthesis failed while streaming')
+            self.close_connection = True
+        finally:
+            chunks.close()
+
+    def _reply(self, status, body, content_type):
+        body = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def address_string(self):
+        # Unix socket clients have no address
+        return self.client_address[0] if self.client_address else 'unix'
+
+    def log_message(self, format, *args):
+        LOG.info('%s %s', self.address_string(), format % args)
+
+
+class _UnixHTTPServer(ThreadingHTTPServer):
+    address_family = socket.AF_UNIX
+
+    def server_bind(self):
+        if os.path.exists(self.server_address):
+            os.unlink(self.server_address)
+        socketserver.TCPServer.server_bind(self)
+        self.server_name = 'localhost'
+        self.server_port = 0
+
+
+def make_server(service, host='127.0.0.1', port=8642, unix_socket=None):
+    """
+        HTTP server for service on host:port or on a Unix socket.
+    """
+    if unix_socket is not None:
+        server = _UnixHTTPServer(unix_socket, _Handler)
+    else:
+        server = ThreadingHTTPServer((host, port), _Handler)
+    server.daemon_threads = True
+    server.service = service
+    return server
+
+
+def _stop(signum, frame):
+    raise KeyboardInterrupt
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='pymimic synthesis server')
+    parser.add_argument('--voice', nargs='+', default=['slt'],
+                        help='Voices to serve, the first is the default')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8642)
+    parser.add_argument('--unix', help='Listen on this Unix socket instead')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--max-requests', type=int, default=1000,
+                        help='Syntheses before a worker is replaced')
+    parser.add_argument('--max-pending', type=int, default=None,
+                        help='Sentences per request queued in the pool')
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+    signal.signal(signal.SIGTERM, _stop)
+
+    service = SynthesisService(args.voice, args.workers, args.max_requests,
+                               args.max_pending)
+    server = make_server(service, args.host, args.port, args.unix)
+    LOG.info('Serving %s on %s', ', '.join(args.voice),
+             args.unix or '{}:{}'.format(args.host, args.port))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+        if args.unix and os.path.exists(args.unix):
+            os.unlink(args.unix)
+
+
+if __name__ == '__main__':
+    main()
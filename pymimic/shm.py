@@ -0,0 +1,122 @@
+"""
+    Shared memory transport of synthesized audio between processes.
+
+    A worker copies the samples of a wave straight from the native buffer
+    into a new shared memory segment and returns a small SharedChunkRef.
+    The parent opens the reference as a SharedChunk whose data is a view
+    of the segment, so the PCM is neither pickled nor copied again.
+
+    Segments stay allocated until the parent calls release() on the chunk
+    (or on a reference it decides not to open).
+"""
+from __future__ import absolute_import, division, print_function, \
+                       unicode_literals
+
+from ctypes import c_char, memmove
+from multiprocessing import resource_tracker, shared_memory
+
+from .audio import _require_numpy
+from .pymimic import SpeechChunk
+
+
+def share_tracker():
+    """
+        Start the resource tracker before worker processes are created.
+        Workers then report their segments to the same tracker as the
+        parent, which stops tracking them on release.
+    """
+    resource_tracker.ensure_running()
+
+
+class SharedChunkRef():
+    """
+        Picklable description of a SpeechChunk held in shared memory.
+    """
+    def __init__(self, name, nbytes, text, phonemes, sample_rate, channels,
+                 start=0.0, encoding='int16'):
+        self.name = name
+        self.nbytes = nbytes
+        self.text = text
+        self.phonemes = phonemes
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.start = start
+        self.encoding = encoding
+
+    def open(self):
+        return SharedChunk(self)
+
+    def release(self):
+        """
+            Free the segment without opening it.
+        """
+        shm = shared_memory.SharedMemory(self.name)
+        shm.close()
+        shm.unlink()
+
+
+def export_speak(speak, start=0.0):
+    """
+        Copy the samples of a Speak into a new shared memory segment and
+        return its SharedChunkRef.
+    """
+    nbytes = speak.num_samples * speak.sample_size
+    # Zero sized segments are not allowed
+    shm = shared_memory.SharedMemory(create=True, size=max(1, nbytes))
+    try:
+        if nbytes:
+            target = (c_char * nbytes).from_buffer(shm.buf)
+            memmove(target, speak.samples, nbytes)
+            del target
+        return SharedChunkRef(shm.name, nbytes, speak.text, speak.phonemes,
+                              speak.sample_rate, speak.channels, start)
+    except Exception:
+        shm.unlink()
+        raise
+    finally:
+        shm.close()
+
+
+class SharedChunk(SpeechChunk):
+    """
+        SpeechChunk whose data is a memoryview of a shared memory segment.
+
+        release() frees the segment, views taken from data or array()
+        have to be gone by then. Otherwise it raises BufferError, the
+        segment is unlinked anyway and the mapping is freed by calling
+        release() again once the views are gone.
+    """
+    def __init__(self, ref):
+        self._shm = shared_memory.SharedMemory(ref.name)
+        self._unlinked = False
+        super(SharedChunk, self).__init__(
+            ref.text, self._shm.buf[:ref.nbytes], ref.phonemes,
+            ref.sample_rate, ref.channels, ref.start, ref.encoding)
+
+    def array(self):
+        """
+            Zero-copy NumPy view of the samples (requires numpy).
+        """
+        numpy = _require_numpy('SharedChunk.array()')
+        dtype = {'int16': numpy.int16, 'float32': numpy.float32}.get(
+            self.encoding, numpy.uint8)
+        return numpy.frombuffer(self.data, dtype=dtype)
+
+    def bin(self):
+        return bytes(self.data)
+
+    def release(self):
+        if self._shm is None:
+            return
+        if not self._unlinked:
+            self._shm.unlink()
+            self._unlinked = True
+        self.data.release()
+        self._shm.close()
+        self._shm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
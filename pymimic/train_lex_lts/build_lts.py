@@ -9,7 +9,7 @@ import os
 from subprocess import call, STDOUT
 from functools import partial
 from .utils import progress_bar
-from .scheme import parse
+from .scheme import read
 from .common import eval_tree
 from .common import read_align, read_lts, process_lts, test_lts
 
@@ -78,14 +78,8 @@ def read_tree(filename):
     """ This parses a lts_scratch/*.tree file. It contains the decision tree
     trained for a letter."""
     with open(filename, "rt") as fd:
-        output = []
-        for line in fd.readlines():
-            # comment (license, author...)
-            if line.startswith(";"):
-                continue
-            output.append(line)
-        all_rules = " ".join(output)
-        lts = parse(all_rules)
+        # skip comments (license, author...)
+        lts = read(line for line in fd if not line.startswith(";"))
     return lts
 
 def _simplify_leaf(leaf):
@@ -12,12 +12,21 @@ Author: Sergio Oller, 2016
 from __future__ import unicode_literals
 from __future__ import print_function
 from codecs import open
+from multiprocessing import Pool, cpu_count
+import gc
+import locale
 import os
 
-from .scheme import parse
+from . import lexcache
+from .scheme import parse, read
 from .utils import progress_bar, logger
 from collections import defaultdict
 
+# read_lexicon reads files in up to SHARDS_PER_LEXICON shards of at least
+# MIN_SHARD_BYTES
+SHARDS_PER_LEXICON = 100
+MIN_SHARD_BYTES = 256 * 1024
+
 
 def read_raw_lexicon(filename):
     """ Reads a lexicon in Festival format
@@ -43,32 +52,124 @@ def read_raw_lexicon(filename):
             yield parse(line)
 
 
-def read_lexicon(filename, is_flat=False, append_stress_to=[]):
+def lexicon_shards(filename, num_shards):
+    """ Splits filename in up to num_shards (start, end) byte ranges.
+    The ranges are cut anywhere, _read_lexicon_shard reads the lines that
+    start in its range so every line is read exactly once."""
+    total_bytes = os.path.getsize(filename)
+    num_shards = max(1, min(num_shards, total_bytes))
+    bounds = [total_bytes * i // num_shards for i in range(num_shards + 1)]
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def _lexicon_entry(line, is_flat, append_stress_to):
+    """ (word, (pos, syls, flattened_syls)) of a parsed lexicon line """
+    try:
+        word = line[0]
+        pos = line[1]
+        syls = line[2]
+        if not is_flat:
+            flattened_syls = flatten_syls(syls, append_stress_to=append_stress_to)
+        else:
+            flattened_syls = syls
+            syls = None
+        return word, (pos, syls, flattened_syls)
+    except:
+        raise ValueError("Malformed line:", line)
+
+
+def _read_lexicon_shard(args):
+    """ Parses the lexicon lines starting between start and end, returns
+    the (word, entry) pairs in file order """
+    filename, start, end, is_flat, append_stress_to = args
+    encoding = locale.getpreferredencoding(False)
+    entries = []
+    with open(filename, "rb") as fd:
+        if start > 0:
+            # The line going on at start belongs to the previous shard
+            fd.seek(start - 1)
+            fd.readline()
+        offset = fd.tell()
+        while offset < end:
+            raw = fd.readline()
+            if not raw:
+                break
+            line = raw.decode(encoding).rstrip()
+            if offset == 0:
+                if line != "MNCL":
+                    entries.append(_lexicon_entry(parse(line), is_flat,
+                                                  append_stress_to))
+            elif line != "":
+                entries.append(_lexicon_entry(parse(line), is_flat,
+                                              append_stress_to))
+            offset += len(raw)
+    return entries
+
+
+def read_lexicon(filename, is_flat=False, append_stress_to=[], workers=None,
+                 progress=True, cache=None):
     """ Converts the lexicon, as parsed by read_lexicon into a
     word->[(part of speech1, phones in syllables1, phones1),
            (part of speech2, phones in syllables2, phones2), ...] dictionary.
     is_flat: False if filename has entries like ("word" pos ( ((a l) 1) ((p e) 0)))
              True if filename has entries like ("word" pos (a1 l p e0))
     append_stress_to: if is_flat is False, to which phones should we add the stress (typically to vocalic phonemes)
+    workers: number of processes parsing shards of the file (default: number
+             of CPUs). Entries are merged in file order, so the entries of a
+             word are in the same order as in the file.
+    progress: show a progress bar
+    cache: load the lexicon from the binary cache written by a previous call
+           with the same file and options if there is one, else parse it and
+           write the cache (see lexcache). None (the default) caches only if
+           PYMIMIC_LEXICON_CACHE=1 is set in the environment.
     """
-    output = defaultdict(list)
+    # The lexicon is millions of small acyclic containers, the cyclic
+    # garbage collector would traverse all of them again and again. The
+    # pool workers run without it too.
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    if cache is None:
+        cache = lexcache.enabled()
+    try:
+        if cache:
+            key = lexcache.cache_key(filename, is_flat, append_stress_to)
+            output = lexcache.load(key)
+            if output is not None:
+                logger.info("Lexicon %s loaded from cache", filename)
+                return output
+        output = _parse_lexicon(filename, is_flat, append_stress_to, workers,
+                                progress)
+        if cache:
+            lexcache.save(key, output)
+        return output
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+
+def _parse_lexicon(filename, is_flat, append_stress_to, workers, progress):
+    workers = workers or cpu_count()
     total_bytes = os.path.getsize(filename)
-    bytes_read = 0
-    for line in read_raw_lexicon(filename):
-        try:
-            bytes_read += len(line)
-            word = line[0]
-            pos = line[1]
-            syls = line[2]
-            if not is_flat:
-                flattened_syls = flatten_syls(syls, append_stress_to=append_stress_to)
-            else:
-                flattened_syls = syls
-                syls = None
-            output[word].append((pos, syls, flattened_syls))
-        except:
-            raise ValueError("Malformed line:", line)
-            progress_bar(bytes_read, total_bytes)
+    num_shards = min(SHARDS_PER_LEXICON, max(1, total_bytes // MIN_SHARD_BYTES))
+    shards = [(filename, start, end, is_flat, append_stress_to)
+              for start, end in lexicon_shards(filename, num_shards)]
+    pool = None
+    if workers > 1 and len(shards) > 1:
+        pool = Pool(min(workers, len(shards)), initializer=gc.disable)
+        results = pool.imap(_read_lexicon_shard, shards)
+    else:
+        results = map(_read_lexicon_shard, shards)
+    output = defaultdict(list)
+    try:
+        for i, entries in enumerate(results):
+            for word, entry in entries:
+                output[word].append(entry)
+            if progress:
+                progress_bar(i, len(shards))
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
     return output
 
 
@@ -117,20 +218,20 @@ def flatten_syls(syls, append_stress_to):
 def read_lts(filename):
     """ This parses a _lts_rules.scm file. It contains the decision tree
     that is used to map words not present in the lexicon to phonemes."""
-    with open(filename, "rt") as fd:
-        output = []
-        for line in fd.readlines():
+    def rule_lines(fd):
+        # A first parenthesis is added because the (set! line has a
+        # parenthesis that we want to keep.
+        yield "("
+        for line in fd:
             # comment (license, author...)
             if line.startswith(";"):
                 continue
             # variable declaration, We don't need it:
             if line.startswith("(set!"):
                 continue
-            output.append(line)
-        # A first parenthesis is added because the (set! line has a
-        # parenthesis that we want to keep.
-        all_rules = "(" + " ".join(output)
-        lts = parse(all_rules)
+            yield line
+    with open(filename, "rt") as fd:
+        lts = read(rule_lines(fd))
     return lts
 
 
@@ -214,6 +315,8 @@ def parse_feat(feat):
 def predict_lex(word, pos=None, lexicon=None, flattened=True):
     """ Predicts the phonetic transcription of word with part of speech `pos`
         using lexicon. If word is not in lexicon returns None.
+        lexicon is a dictionary as returned by read_lexicon or a
+        lexindex.LexiconIndex.
         `flattened` is a boolean that determines if the prediction should
         be the phones with syllabification or the flattened phones
     """
@@ -9,6 +9,7 @@ from __future__ import unicode_literals
 from __future__ import print_function
 import copy
 from collections import defaultdict
+import math
 
 from .common import read_lexicon, write_lex
 from .utils import progress_bar, logger
@@ -93,13 +94,128 @@ def find_all_aligns(phones, letters, pl_table):
     return r
 
 
-def cummulate(phone, letter, pl_table):
-    "record the alignment of this phone and letter."
+def count_aligns(phones, letters, pl_table):
+    """Number of feasible alignments, as found by find_all_aligns, and the
+    number of them going through each (phone, letter) pair.
+
+    Alignments are paths in a lattice of (phones left, letters left) states,
+    the number of paths through a pair is the number of paths reaching its
+    state times the number of paths from its next state to the end, so no
+    path is built. Raises IndexError where find_all_aligns does."""
+    num_phones = len(phones)
+    num_letters = len(letters)
+    forward = {(0, 0): 1}
+    # (state, next state, pair) in order of letters consumed, None is the end
+    edges = []
+    for j in range(num_letters + 1):
+        # valid_pair and valid_pair_e without adding letters to pl_table
+        letter = letters[j] if j < num_letters else None
+        allowed = pl_table.get(letter, ()) if letter is not None else ()
+        epsilon = '_epsilon_' in allowed
+        for i in range(num_phones + 1):
+            paths = forward.get((i, j))
+            if paths is None:
+                continue
+            if (num_phones - i == 1 and num_letters - j == 1 and
+                    phones[i] == letter and letter == '#'):
+                edges.append(((i, j), None, ('#', '#')))
+                continue
+            if j == num_letters:
+                raise IndexError("No letters left for phones {}".format(
+                    phones[i:]))
+            nexts = []
+            if epsilon:
+                nexts.append(((i, j + 1), '_epsilon_'))
+            if i == num_phones:
+                raise IndexError("No phones left for letters {}".format(
+                    letters[j:]))
+            phone = phones[i]
+            if phone in allowed:
+                nexts.append(((i + 1, j + 1), phone))
+            if num_phones - i > 1:
+                two_phones = phone + "-" + phones[i + 1]
+                if two_phones in allowed:
+                    nexts.append(((i + 2, j + 1), two_phones))
+            for state, phone in nexts:
+                forward[state] = forward.get(state, 0) + paths
+                edges.append(((i, j), state, (phone, letter)))
+    backward = {None: 1}
+    for state, next_state, _ in reversed(edges):
+        backward[state] = backward.get(state, 0) + backward.get(next_state, 0)
+    pair_counts = defaultdict(int)
+    for state, next_state, pair in edges:
+        paths = forward[state] * backward.get(next_state, 0)
+        if paths:
+            pair_counts[pair] += paths
+    return backward.get((0, 0), 0), pair_counts
+
+
+# Up to this many additions are done one by one, that is faster than
+# working out the rounding
+_LOOP_ADDS = 16
+
+
+def _repeat_add(value, score, count):
+    """value + score + score ... (count times) rounding after every addition
+    like the float additions do, in O(log) steps.
+
+    Between powers of two all floats are multiples of the same ulp and adding
+    score moves by the same number of ulps every time (on ties the first
+    addition makes the mantissa even and it stays even), so runs of
+    additions are done at once."""
+    if count <= 0:
+        return value
+    if (score == 1.0 and float(value).is_integer() and
+            0 <= value <= 2 ** 53 - count):
+        # Integers up to 2**53 are exact, nothing is rounded
+        return float(value) + count
+    # score == num / den, den a power of two
+    num, den = float(score).as_integer_ratio()
+    while count > 0:
+        if count <= _LOOP_ADDS:
+            for _ in range(count):
+                value += score
+            break
+        value += score
+        count -= 1
+        exponent = math.frexp(value)[1]
+        shift = 53 - exponent
+        # value == mantissa * 2**-shift, 2**52 <= mantissa < 2**53
+        mantissa = int(math.ldexp(value, shift))
+        # score in ulps of value: ulps + rest / divisor
+        if shift >= 0:
+            ulps, rest = divmod(num << shift, den)
+            divisor = den
+        else:
+            divisor = den << -shift
+            ulps, rest = divmod(num, divisor)
+        if 2 * rest == divisor and mantissa % 2:
+            continue
+        if 2 * rest > divisor or (2 * rest == divisor and ulps % 2):
+            ulps += 1
+        if ulps == 0:
+            break
+        # Additions whose exact sum stays below the next power of two
+        runs = min(count, (2 ** 53 - 1 - ulps - mantissa) // ulps + 1)
+        if runs <= 0:
+            continue
+        mantissa += runs * ulps
+        count -= runs
+        value = math.ldexp(mantissa, -shift)
+    return value
+
+
+def cummulate(phone, letter, pl_table, count=1):
+    "record the alignment of this phone and letter (count times)."
     if (phone == letter or (phone != "#" and letter != "#")):
         score = 1.0
         if phone == "_epsilon_":
             score = 0.1
-        pl_table[letter][phone] += score
+        if count == 1:
+            pl_table[letter][phone] += score
+        else:
+            pl_table[letter][phone] = _repeat_add(pl_table[letter][phone],
+                                                  score, count)
     return
 
 
@@ -129,17 +245,18 @@ def cummulate_pairs(lexicon, allowables):
             bound_phones = ['#'] + phones + ['#']
             bound_word = ['#'] + list(word) + ['#']
             try:
-                all_aligns = find_all_aligns(bound_phones,
-                                             bound_word,
-                                             pl_table)
+                num_aligns, pair_counts = count_aligns(bound_phones,
+                                                       bound_word,
+                                                       pl_table)
             except:
                 print(bound_word)
                 print(bound_phones)
                 raise
-            if len(all_aligns) == 0:
+            if num_aligns == 0:
                 failed_aligns += 1
                 failed_list.append((word, " ".join(phones)))
-            cummulate_aligns(all_aligns, pl_table)
+            for (phone, letter), count in pair_counts.items():
+                cummulate(phone, letter, pl_table, count)
             count_all_aligns += 1
     logger.debug("\n".join([": ".join(x) for x in failed_list]))
     logger.info("Failed aligns: {}/{}".format(failed_aligns, count_all_aligns))
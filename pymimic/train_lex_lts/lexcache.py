@@ -0,0 +1,216 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Binary cache of parsed lexicons.
+
+With caching enabled (read_lexicon(cache=True) or PYMIMIC_LEXICON_CACHE=1
+in the environment), read_lexicon stores the dictionary it builds from a
+Festival lexicon in a cache file, later reads of the same file with the
+same options load the cache instead of parsing the text again. Cache files
+are not removed automatically, they live in cache_dir().
+
+A cache file is keyed by the SHA-1 of the lexicon contents, is_flat and
+append_stress_to. It holds:
+
+- a header (magic, key, sizes)
+- the atoms (words, parts of speech, phones and stresses) as a JSON list,
+  each distinct atom is stored and loaded once
+- the entries as an array of 32 bit atom IDs and lengths:
+  word, number of entries and for each entry
+  pos, number of syllables (NO_SYLS if there are none),
+  (stress, number of phones, phones) for each syllable,
+  number of flattened phones, flattened phones
+
+Lexicons with entries that do not fit this layout are not cached.
+"""
+from __future__ import unicode_literals
+from __future__ import print_function
+from array import array
+from collections import defaultdict
+import hashlib
+import json
+import os
+import struct
+import sys
+import tempfile
+
+from ..pymimic import _cache_dir
+from .utils import logger
+
+MAGIC = b'PYMLEX01'
+NO_SYLS = 0xFFFFFFFF
+_header = struct.Struct('<8s20sIII')
+_atom_types = (str, int, float)
+
+
+class Uncacheable(Exception):
+    """ A value that does not fit the cache layout """
+
+
+def enabled():
+    """ Whether read_lexicon caches by default: PYMIMIC_LEXICON_CACHE is set
+    to something other than 0 """
+    return os.environ.get('PYMIMIC_LEXICON_CACHE', '0') not in ('', '0')
+
+
+def cache_dir():
+    """ Directory of the lexicon caches, lexicons in pymimic's cache
+    directory (PYMIMIC_CACHE_DIR or ~/.cache/pymimic) """
+    return os.path.join(_cache_dir(), 'lexicons')
+
+
+def cache_key(filename, is_flat, append_stress_to):
+    """ SHA-1 of the lexicon contents and the read_lexicon options """
+    digest = hashlib.sha1()
+    with open(filename, 'rb') as fd:
+        for block in iter(lambda: fd.read(1 << 20), b''):
+            digest.update(block)
+    digest.update(json.dumps([bool(is_flat), list(append_stress_to)],
+                             ensure_ascii=True).encode('ascii'))
+    return digest.digest()
+
+
+def cache_file(key, directory=None):
+    return os.path.join(directory or cache_dir(),
+                        '{}.lex'.format(key.hex()))
+
+
+class Atoms():
+    """ Interned atoms: each distinct value gets an ID """
+    def __init__(self):
+        self.values = []
+        self._ids = {}
+
+    def id(self, value):
+        if type(value) not in _atom_types:
+            raise Uncacheable(value)
+        # 1, 1.0 and "1" are different atoms
+        key = (type(value), value)
+        index = self._ids.get(key)
+        if index is None:
+            index = self._ids[key] = len(self.values)
+            self.values.append(value)
+        return index
+
+
+def encode_entries(entries, atoms, data):
+    """ Appends the entries of a word to the data array """
+    def phones(seq):
+        if not isinstance(seq, list):
+            raise Uncacheable(seq)
+        data.append(len(seq))
+        data.extend(atoms.id(phone) for phone in seq)
+
+    data.append(len(entries))
+    for pos, syls, flattened in entries:
+        data.append(atoms.id(pos))
+        if syls is None:
+            data.append(NO_SYLS)
+        else:
+            data.append(len(syls))
+            for syl in syls:
+                if not isinstance(syl, list) or len(syl) != 2:
+                    raise Uncacheable(syl)
+                data.append(atoms.id(syl[1]))
+                phones(syl[0])
+        phones(flattened)
+
+
+def decode_entries(atoms, data, i=0):
+    """ The entries of a word encoded at data[i:] and the index after them.
+    data is a list """
+    atom = atoms.__getitem__
+    entries = []
+    num_entries = data[i]
+    i += 1
+    for _ in range(num_entries):
+        pos = atoms[data[i]]
+        num_syls = data[i + 1]
+        i += 2
+        syls = None
+        if num_syls != NO_SYLS:
+            syls = []
+            for _ in range(num_syls):
+                end = i + 2 + data[i + 1]
+                syls.append([list(map(atom, data[i + 2:end])),
+                             atoms[data[i]]])
+                i = end
+        end = i + 1 + data[i]
+        entries.append((pos, syls, list(map(atom, data[i + 1:end]))))
+        i = end
+    return entries, i
+
+
+def _encode(lexicon):
+    atoms = Atoms()
+    data = array('I')
+    for word, entries in lexicon.items():
+        data.append(atoms.id(word))
+        encode_entries(entries, atoms, data)
+    return atoms.values, data
+
+
+def _decode(atoms, data, num_words):
+    output = defaultdict(list)
+    data = data.tolist()
+    i = 0
+    for _ in range(num_words):
+        word = atoms[data[i]]
+        entries, i = decode_entries(atoms, data, i + 1)
+        output[word].extend(entries)
+    return output
+
+
+def load(key, directory=None):
+    """ The cached lexicon for key, None if there is no valid cache """
+    try:
+        with open(cache_file(key, directory), 'rb') as fd:
+            raw = fd.read()
+    except (IOError, OSError):
+        return None
+    try:
+        magic, stored_key, atoms_len, num_words, num_values = \
+            _header.unpack_from(raw)
+        start = _header.size + atoms_len
+        if (magic != MAGIC or stored_key != key or
+                len(raw) != start + 4 * num_values):
+            return None
+        atoms = json.loads(raw[_header.size:start].decode('utf-8'))
+        data = array('I')
+        data.frombytes(raw[start:])
+        if sys.byteorder != 'little':
+            data.byteswap()
+        return _decode(atoms, data, num_words)
+    except (struct.error, ValueError, IndexError, StopIteration):
+        logger.warning("Ignoring corrupt lexicon cache %s",
+                       cache_file(key, directory))
+        return None
+
+
+def save(key, lexicon, directory=None):
+    """ Stores lexicon in the cache. Best effort, errors are logged """
+    try:
+        atoms, data = _encode(lexicon)
+    except Uncacheable as e:
+        logger.info("Lexicon not cached, unsupported value: %r", e.args[0])
+        return False
+    if sys.byteorder != 'little':
+        data.byteswap()
+    atoms = json.dumps(atoms, ensure_ascii=False).encode('utf-8')
+    filename = cache_file(key, directory)
+    tmp_path = None
+    try:
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(filename))
+        with os.fdopen(fd, 'wb') as f:
+            f.write(_header.pack(MAGIC, key, len(atoms), len(lexicon),
+                                 len(data)))
+            f.write(atoms)
+            data.tofile(f)
+        os.replace(tmp_path, filename)
+        return True
+    except (IOError, OSError) as e:
+        logger.warning("Could not write lexicon cache %s: %s", filename, e)
+        if tmp_path is not None and os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        return False
@@ -0,0 +1,184 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Sorted on-disk lexicon index.
+
+write_index stores a lexicon as returned by read_lexicon in an index file,
+LexiconIndex opens it with mmap and looks words up by binary search over
+the sorted keys. Only the entries of the words looked up are decoded, so
+a large lexicon can be used without loading it in memory:
+
+    with LexiconIndex("cmu_lex.idx") as lexicon:
+        predict("hello", lexicon=lexicon, lts=lts)
+
+The file holds, after a header (magic and sizes):
+
+- the atoms (parts of speech, phones and stresses) as a JSON list
+- the offsets of each key in the key blob (num_words + 1 values)
+- the offsets of the entries of each word (num_words + 1 values)
+- the entries, encoded as in lexcache
+- the key blob: the UTF-8 words, sorted
+
+The offsets and entries are 32 bit unsigned integers.
+"""
+from __future__ import unicode_literals
+from __future__ import print_function
+from array import array
+try:
+    from collections.abc import ItemsView, Mapping
+except ImportError:
+    from collections import ItemsView, Mapping
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+
+from .lexcache import Atoms, decode_entries, encode_entries
+
+MAGIC = b'PYMLXI01'
+_header = struct.Struct('<8sIIII')
+
+
+def write_index(lexicon, filename):
+    """ Writes the word->[(pos, syls, phones), ...] lexicon to an index file.
+    Raises lexcache.Uncacheable if an entry does not fit the layout. """
+    keys = sorted((word.encode('utf-8'), word) for word in lexicon)
+    atoms = Atoms()
+    key_offsets = array('I', [0])
+    value_offsets = array('I', [0])
+    values = array('I')
+    for key, word in keys:
+        encode_entries(lexicon[word], atoms, values)
+        key_offsets.append(key_offsets[-1] + len(key))
+        value_offsets.append(len(values))
+    atoms = json.dumps(atoms.values, ensure_ascii=False).encode('utf-8')
+    # Keep the arrays after the atoms 4 byte aligned
+    atoms += b' ' * (-(_header.size + len(atoms)) % 4)
+    if sys.byteorder != 'little':
+        for data in (key_offsets, value_offsets, values):
+            data.byteswap()
+
+    directory = os.path.dirname(os.path.abspath(filename))
+    fd, tmp_path = tempfile.mkstemp(dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(_header.pack(MAGIC, len(keys), len(atoms),
+                                 key_offsets[-1], len(values)))
+            f.write(atoms)
+            key_offsets.tofile(f)
+            value_offsets.tofile(f)
+            values.tofile(f)
+            for key, _ in keys:
+                f.write(key)
+        os.replace(tmp_path, filename)
+    except:
+        os.unlink(tmp_path)
+        raise
+
+
+class _ItemsView(ItemsView):
+    # Walks the index in order instead of looking every key up
+    def __iter__(self):
+        index = self._mapping
+        for i in range(len(index)):
+            yield index._key(i).decode('utf-8'), index._entries(i)
+
+
+class LexiconIndex(Mapping):
+    """ Read only word->[(pos, syls, phones), ...] mapping backed by an index
+    file, usable as the lexicon of predict_lex, predict and prune_lexicon.
+    Iteration is in sorted order. """
+    def __init__(self, filename):
+        with open(filename, 'rb') as fd:
+            self._mm = mmap.mmap(fd.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._mm)
+        try:
+            (magic, self._num_words, atoms_len, keys_len,
+             num_values) = _header.unpack_from(self._mm)
+            if magic != MAGIC:
+                raise ValueError("Not a lexicon index: {}".format(filename))
+            start = _header.size + atoms_len
+            self._atoms = json.loads(
+                view[_header.size:start].tobytes().decode('utf-8'))
+            sizes = (self._num_words + 1, self._num_words + 1, num_values)
+            arrays = []
+            for size in sizes:
+                arrays.append(view[start:start + 4 * size].cast('I'))
+                start += 4 * size
+            if sys.byteorder != 'little':
+                arrays = [array('I', data) for data in arrays]
+                for data in arrays:
+                    data.byteswap()
+            self._key_offsets, self._value_offsets, self._values = arrays
+            self._keys_start = start
+            if len(self._mm) != start + keys_len:
+                raise ValueError("Truncated lexicon index: {}".format(filename))
+        except:
+            view.release()
+            self.close()
+            raise
+        view.release()
+
+    def _key(self, i):
+        return self._mm[self._keys_start + self._key_offsets[i]:
+                        self._keys_start + self._key_offsets[i + 1]]
+
+    def _find(self, word):
+        """ Position of word in the sorted keys, -1 if missing """
+        try:
+            key = word.encode('utf-8')
+        except AttributeError:
+            return -1
+        lo, hi = 0, self._num_words
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self._num_words and self._key(lo) == key:
+            return lo
+        return -1
+
+    def _entries(self, i):
+        data = self._values[self._value_offsets[i]:
+                            self._value_offsets[i + 1]].tolist()
+        return decode_entries(self._atoms, data)[0]
+
+    def __getitem__(self, word):
+        i = self._find(word)
+        if i < 0:
+            raise KeyError(word)
+        return self._entries(i)
+
+    def __contains__(self, word):
+        return self._find(word) >= 0
+
+    def __len__(self):
+        return self._num_words
+
+    def __iter__(self):
+        for i in range(self._num_words):
+            yield self._key(i).decode('utf-8')
+
+    def items(self):
+        return _ItemsView(self)
+
+    def close(self):
+        if self._mm is None:
+            return
+        for name in ('_key_offsets', '_value_offsets', '_values'):
+            data = getattr(self, name, None)
+            if isinstance(data, memoryview):
+                data.release()
+        self._key_offsets = self._value_offsets = self._values = None
+        self._mm.close()
+        self._mm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -8,7 +8,7 @@ Created on Fri Apr  8 01:18:41 2016
 import os
 from subprocess import call, STDOUT
 from .utils import progress_bar
-from .scheme import parse
+from .scheme import read
 from collections import defaultdict
 
 def _call_wfst_build(input_fn, output_fn, wfst_build, logfh=None):
@@ -135,17 +135,19 @@ def _parse_wfst(wfst_file, state_index, phone_table):
     qtrues = []
     qfalses = []
     state = None
-    lines = []
     tree_to_state_map = dict()
-    with open(wfst_file) as fh:
+
+    def wfst_lines(fh):
+        yield "("
         # Skip wfst header
-        in_header = True
-        for line in fh.readlines():
-            if not in_header:
-                lines.append(line)
+        for line in fh:
             if line.startswith("EST_Header_End"):
-                in_header = False
-    wfst_tree = parse("(" + " ".join(lines) + ")")
+                break
+        for line in fh:
+            yield line
+        yield ")"
+    with open(wfst_file) as fh:
+        wfst_tree = read(wfst_lines(fh))
     for tree in wfst_tree:
         num_tree = tree[0][0]
         final_or_not = tree[0][1]
@@ -8,56 +8,109 @@
 # - The tokenizer uses deque for faster performance
 # - atom unquotes string symbols (useful for parsing lexicon in festival
 #   format)
+# - Single pass regex tokenizer, quoted strings may contain spaces and
+#   parentheses
+# - Iterative reader with an explicit stack, so deep trees do not hit the
+#   recursion limit, and a streaming mode reading forms from a file
 ##############################################################################
 
 from __future__ import unicode_literals
 from __future__ import print_function
 
 from collections import deque
+import re
 
 Symbol = str  # A Scheme Symbol is implemented as a Python str
 List = list  # A Scheme List is implemented as a Python list
 Number = (int, float)  # A Scheme Number is implemented as a int or float
 String = str  # A Scheme Symbol that is a string
 
+# A parenthesis, a quoted string or a run of anything else up to whitespace
+# or a parenthesis. A quote not followed by a delimiter after the closing
+# quote is part of an ordinary token, as it always was.
+_token_re = re.compile(r'[()]|"[^"\n]*"(?=[\s()]|$)|[^\s()]+')
+
+# Unquoted tokens (phones, nil, stress marks...) repeat a lot in lexicons,
+# remember what they evaluate to.
+_atom_cache = {}
+_ATOM_CACHE_SIZE = 100000
+
 
 def tokenize(chars):
     "Convert a string of characters into a list of tokens."
-    return deque(chars.replace('(', ' ( ').replace(')', ' ) ').split())
+    return deque(_token_re.findall(chars))
 
 
 def parse(program, encoding="utf-8"):
     "Read a Scheme expression from a string."
-    return read_from_tokens(tokenize(program), encoding)
+    return read([program], encoding)
+
+
+def read(lines, encoding="utf-8"):
+    "Read the first Scheme expression from an iterable of lines."
+    for form in read_forms(lines, encoding):
+        return form
+    raise SyntaxError('unexpected EOF while reading')
+
+
+def read_forms(lines, encoding="utf-8"):
+    """Yield the top level expressions read from an iterable of lines, such
+    as a file object, each one as soon as it is complete."""
+    return _read_forms(_tokens(lines), encoding)
 
 
 def read_from_tokens(tokens, encoding):
     "Read an expression from a sequence of tokens."
-    if len(tokens) == 0:
+    def consume():
+        while tokens:
+            yield tokens.popleft()
+    for form in _read_forms(consume(), encoding):
+        return form
+    raise SyntaxError('unexpected EOF while reading')
+
+
+def _tokens(lines):
+    findall = _token_re.findall
+    for line in lines:
+        for token in findall(line):
+            yield token
+
+
+def _read_forms(tokens, encoding):
+    stack = []
+    for token in tokens:
+        if token == '(':
+            stack.append([])
+            continue
+        if token == ')':
+            if not stack:
+                raise SyntaxError('unexpected )')
+            value = stack.pop()
+        else:
+            value = atom(token, encoding)
+        if stack:
+            stack[-1].append(value)
+        else:
+            yield value
+    if stack:
         raise SyntaxError('unexpected EOF while reading')
-    token = tokens.popleft()
-    if token == '(':
-        L = []
-        while tokens[0] != ')':
-            L.append(read_from_tokens(tokens, encoding))
-        tokens.popleft()  # pop off ')'
-        return L
-    elif token == ')':
-        raise SyntaxError('unexpected )')
-    else:
-        return atom(token, encoding)
-
-
-def atom(token, encoding):
+
+
+def atom(token, encoding=None):
     """Numbers become numbers; Strings become strings,
      every other token is a symbol."""
-    try:
-        return int(token)
-    except ValueError:
+    if token[0] == '"' and token[-1] == '"':
+        # int() and float() reject anything starting with a quote
+        return String(token[1:-1])
+    value = _atom_cache.get(token)
+    if value is None:
         try:
-            return float(token)
+            value = int(token)
         except ValueError:
-            if token[0] == '"' and token[-1] == '"':
-                return String(token[1:-1])
-            else:
-                return Symbol(token)
+            try:
+                value = float(token)
+            except ValueError:
+                value = Symbol(token)
+        if len(_atom_cache) < _ATOM_CACHE_SIZE:
+            _atom_cache[token] = value
+    return value
@@ -9,6 +9,7 @@ setup(name='pymimic',
       packages = find_packages(),
       scripts = [os.path.join('bin', 'mimic_make_lex')],
       include_package_data=True,
+      python_requires='>=3.8',
       description='Python wrapper for mimic',
       author='Åke Forslund',
       author_email='ake.forslund@gmail.com',
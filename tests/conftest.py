@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+import os
+import subprocess
+import sys
+
+import pytest
+
+BENCHMARKS = os.path.join(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))), 'benchmarks')
+
+
+@pytest.fixture(scope='session')
+def fake_library():
+    """ Path of the stand-in libttsmimiccore from benchmarks/fake_mimic,
+    loaded in this process """
+    sys.path.insert(0, BENCHMARKS)
+    try:
+        import fakelib
+        path = fakelib.build()
+    except (OSError, subprocess.CalledProcessError) as e:
+        pytest.skip('Can not build the fake library: {}'.format(e))
+    finally:
+        sys.path.remove(BENCHMARKS)
+    from pymimic.pymimic import load, _library_path
+    load(path=path)
+    if _library_path() != path:
+        pytest.skip('Another libttsmimiccore is loaded')
+    return path
+
+
+@pytest.fixture
+def voice(fake_library):
+    from pymimic.pymimic import Voice
+    with Voice('slt') as voice:
+        yield voice
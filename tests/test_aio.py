@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+import asyncio
+from concurrent.futures import Future, ProcessPoolExecutor
+
+from pymimic import aio
+
+
+class InlineProcessPool(ProcessPoolExecutor):
+    """ Runs jobs in the calling thread, recording their arguments """
+    def __init__(self):
+        super().__init__(1)
+        self.calls = []
+
+    def submit(self, fn, *args):
+        self.calls.append(args)
+        future = Future()
+        future.set_result(fn(*args))
+        return future
+
+
+def test_concurrency_limit_per_loop(voice):
+    synthesizer = aio.Synthesizer(max_concurrency=1)
+
+    async def speak_all():
+        chunks = await asyncio.gather(*[synthesizer.speak('Hello.', voice)
+                                        for _ in range(4)])
+        return [len(chunk.data) for chunk in chunks]
+    # Contended in one loop, then used again in another
+    first = asyncio.run(speak_all())
+    assert asyncio.run(speak_all()) == first
+    assert first[0] > 0
+
+
+def test_process_pool_gets_voice_features(voice):
+    executor = InlineProcessPool()
+    voice.set_features([('duration_stretch', 1.5)])
+    try:
+        synthesizer = aio.Synthesizer(executor)
+        chunk = asyncio.run(synthesizer.speak('Hello.', voice,
+                                              [('int_f0_target_mean', 90)]))
+    finally:
+        voice.set_features([('duration_stretch', 1.0)])
+        executor.shutdown()
+    assert chunk.data
+    text, name, features = executor.calls[0]
+    assert name == 'slt'
+    assert features == [('duration_stretch', 1.5), ('int_f0_target_mean', 90)]
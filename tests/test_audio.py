@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+from array import array
+import io
+import sys
+import wave
+
+from pymimic.audio import (WAVE_FORMAT_IEEE_FLOAT, WavStreamWriter,
+                           little_endian, wav_header, write_audio)
+
+SAMPLES = array('h', [0, 1, -1, 32767, -32768, 1234, -4321, 7])
+
+
+def pcm_bytes(samples=SAMPLES):
+    data = array('h', samples)
+    if sys.byteorder != 'little':
+        data.byteswap()
+    return data.tobytes()
+
+
+def read_wav(data):
+    with wave.open(io.BytesIO(data)) as w:
+        return (w.getframerate(), w.getnchannels(), w.getsampwidth(),
+                w.readframes(w.getnframes()))
+
+
+def test_wav_header_fields():
+    header = wav_header(100, 16000, channels=2, sample_width=2)
+    assert len(header) == 44
+    assert header[:4] == b'RIFF' and header[8:16] == b'WAVEfmt '
+    assert int.from_bytes(header[4:8], 'little') == 136
+    assert int.from_bytes(header[24:28], 'little') == 16000
+    # Byte rate and block align
+    assert int.from_bytes(header[28:32], 'little') == 64000
+    assert int.from_bytes(header[32:34], 'little') == 4
+    assert header[36:40] == b'data'
+    assert int.from_bytes(header[40:44], 'little') == 100
+
+
+def test_wav_header_unknown_size():
+    header = wav_header(None, 8000, format_tag=WAVE_FORMAT_IEEE_FLOAT,
+                        sample_width=4)
+    assert header[4:8] == b'\xff\xff\xff\xff'
+    assert header[40:44] == b'\xff\xff\xff\xff'
+    assert int.from_bytes(header[20:22], 'little') == WAVE_FORMAT_IEEE_FLOAT
+    assert int.from_bytes(header[34:36], 'little') == 32
+
+
+def test_write_audio_wav():
+    out = io.BytesIO()
+    write_audio(out, array('h', SAMPLES), 16000)
+    assert read_wav(out.getvalue()) == (16000, 1, 2, pcm_bytes())
+
+
+def test_write_audio_raw():
+    out = io.BytesIO()
+    write_audio(out, array('h', SAMPLES), 16000, format='raw')
+    assert out.getvalue() == pcm_bytes()
+
+
+def test_little_endian():
+    assert bytes(little_endian(array('h', SAMPLES))) == pcm_bytes()
+
+
+def test_stream_writer_fills_in_sizes():
+    out = io.BytesIO()
+    with WavStreamWriter(out, 22050) as writer:
+        writer.write(array('h', SAMPLES[:3]))
+        writer.write(array('h', SAMPLES[3:]))
+    assert writer.data_size == 2 * len(SAMPLES)
+    assert read_wav(out.getvalue()) == (22050, 1, 2, pcm_bytes())
+
+
+class Unseekable(io.RawIOBase):
+    def __init__(self):
+        self.data = bytearray()
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self.data += b
+        return len(b)
+
+
+def test_stream_writer_unseekable():
+    out = Unseekable()
+    with WavStreamWriter(out, 16000) as writer:
+        writer.write(array('h', SAMPLES))
+    assert bytes(out.data[:44]) == wav_header(None, 16000)
+    assert bytes(out.data[44:]) == pcm_bytes()
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+import os
+import time
+
+from pymimic.cache import SynthesisCache, cache_key, normalize_text
+from pymimic.pymimic import SpeechChunk
+
+
+class FakeVoice():
+    def __init__(self, name, feature_values=None):
+        self.name = name
+        self.feature_values = feature_values or {}
+
+
+def chunk(size, text='text'):
+    return SpeechChunk(text, b'\x01' * size, [(b'pau', 0.1)], 16000, 1, 0.0)
+
+
+def test_normalize_text():
+    assert normalize_text(' Hello \t\n world ') == 'Hello world'
+    # NFD input gives the NFC key
+    assert normalize_text('n\u0303') == '\u00f1'
+
+
+def test_key_depends_on_voice_text_and_features():
+    voice = FakeVoice('slt')
+    key = cache_key(voice, 'Hello  world')
+    assert key == cache_key(FakeVoice('slt'), 'Hello world')
+    assert key != cache_key(FakeVoice('kal'), 'Hello world')
+    assert key != cache_key(voice, 'Hello world!')
+    assert key != cache_key(voice, 'Hello world', [('duration_stretch', 1.2)])
+    assert (cache_key(voice, 'Hello world', [('duration_stretch', 1.2)]) !=
+            cache_key(voice, 'Hello world', [('duration_stretch', 1.3)]))
+    # Features set on the voice itself
+    stretched = FakeVoice('slt', {'duration_stretch': 1.2})
+    assert key != cache_key(stretched, 'Hello world')
+
+
+def test_memory_lru_items():
+    cache = SynthesisCache(max_items=2)
+    cache.put('a', chunk(10))
+    cache.put('b', chunk(10))
+    assert cache.get('a') is not None
+    cache.put('c', chunk(10))
+    # b was the least recently used
+    assert cache.get('b') is None
+    assert cache.get('a') is not None and cache.get('c') is not None
+    assert cache.stats['evictions'] == 1
+    assert cache.stats['items'] == 2
+    assert cache.stats['misses'] == 1
+
+
+def test_memory_lru_bytes():
+    cache = SynthesisCache(max_items=None, max_bytes=25)
+    for key in 'abc':
+        cache.put(key, chunk(10))
+    assert cache.stats['bytes'] == 20
+    assert cache.get('a') is None
+    # Replacing an entry does not count it twice
+    cache.put('b', chunk(5))
+    assert cache.stats['bytes'] == 15
+
+
+def test_disk_round_trip(tmp_path):
+    cache = SynthesisCache(directory=str(tmp_path))
+    cache.put('ab' + 'c' * 62, chunk(100, 'ñandú'))
+    other = SynthesisCache(directory=str(tmp_path))
+    loaded = other.get('ab' + 'c' * 62)
+    assert other.stats['disk_hits'] == 1
+    assert loaded.text == 'ñandú' and loaded.data == b'\x01' * 100
+    assert loaded.phonemes == [(b'pau', 0.1)]
+    assert (loaded.sample_rate, loaded.channels) == (16000, 1)
+
+
+def test_corrupt_disk_entry(tmp_path):
+    cache = SynthesisCache(directory=str(tmp_path))
+    key = 'cd' + 'e' * 62
+    cache.put(key, chunk(100))
+    with open(cache._path(key), 'r+b') as f:
+        f.truncate(3)
+    cache.clear()
+    assert cache.get(key) is None
+
+
+def test_disk_eviction_to_low_water(tmp_path):
+    cache = SynthesisCache(max_items=0, directory=str(tmp_path))
+    keys = ['{:02x}'.format(i) + 'f' * 62 for i in range(10)]
+    for i, key in enumerate(keys):
+        cache.put(key, chunk(1000))
+        # Distinct mtimes, the oldest is evicted first
+        os.utime(cache._path(key), (time.time() - 100 + i,) * 2)
+    entry_size = os.path.getsize(cache._path(keys[0]))
+    cache.max_disk_bytes = 10 * entry_size
+    cache.put('ff' + '0' * 62, chunk(1000))
+    # Down to 90% of the budget, not just under it
+    assert cache.stats['disk_bytes'] <= 9 * entry_size
+    assert cache.stats['disk_evictions'] == 2
+    assert not os.path.exists(cache._path(keys[0]))
+    assert not os.path.exists(cache._path(keys[1]))
+    assert os.path.exists(cache._path(keys[2]))
+    # Under the budget nothing more is removed
+    cache.put('fe' + '0' * 62, chunk(1000))
+    assert cache.stats['disk_evictions'] == 2
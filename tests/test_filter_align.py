@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+from collections import defaultdict
+import random
+
+import pytest
+
+from pymimic.train_lex_lts.filter_align import (
+    _repeat_add, cummulate_aligns, cummulate_pairs, find_all_aligns)
+
+LETTERS = 'abcde'
+PHONES = ['p', 'q', 'r', 's', 't', 'u']
+
+
+def enumerated_cummulate_pairs(lexicon, allowables):
+    """ cummulate_pairs as it was, building every alignment """
+    failed_list = []
+    pl_table = defaultdict(lambda: defaultdict(int))
+    for letter, phones in allowables.items():
+        for phone in phones:
+            pl_table[letter][phone] = 0
+    for word, heteronyms in sorted(lexicon.items()):
+        for heteronym in heteronyms:
+            phones = heteronym[2]
+            all_aligns = find_all_aligns(['#'] + phones + ['#'],
+                                         ['#'] + list(word) + ['#'],
+                                         pl_table)
+            if len(all_aligns) == 0:
+                failed_list.append((word, " ".join(phones)))
+            cummulate_aligns(all_aligns, pl_table)
+    return pl_table, failed_list
+
+
+def random_allowables(rng):
+    allowables = {'#': ['#']}
+    for letter in LETTERS:
+        phones = rng.sample(PHONES, rng.randint(1, 4))
+        if rng.random() < 0.6:
+            phones.append('_epsilon_')
+        if rng.random() < 0.5:
+            first, second = rng.sample(PHONES, 2)
+            phones.append(first + '-' + second)
+        allowables[letter] = phones
+    return allowables
+
+
+def random_entry(rng, word, allowables):
+    """ Phones for word, mostly alignable, sometimes not """
+    phones = []
+    for letter in word:
+        choice = rng.choice(allowables[letter])
+        if choice != '_epsilon_':
+            phones.extend(choice.split('-'))
+    if rng.random() < 0.2:
+        phones.insert(rng.randint(0, len(phones)), rng.choice(PHONES))
+    if not phones:
+        phones = [rng.choice(PHONES)]
+    return ('nil', None, phones)
+
+
+def random_lexicon(rng, num_words):
+    allowables = random_allowables(rng)
+    lexicon = {}
+    while len(lexicon) < num_words:
+        word = ''.join(rng.choice(LETTERS) for _ in range(rng.randint(1, 7)))
+        lexicon[word] = [random_entry(rng, word, allowables)
+                         for _ in range(rng.randint(1, 2))]
+    return lexicon, allowables
+
+
+def as_dict(pl_table):
+    return dict((letter, dict(phones)) for letter, phones in pl_table.items())
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_cummulate_pairs_matches_enumeration(seed):
+    lexicon, allowables = random_lexicon(random.Random(seed), 40)
+    pl_table, failed_list = cummulate_pairs(lexicon, allowables)
+    expected_table, expected_failed = enumerated_cummulate_pairs(lexicon,
+                                                                 allowables)
+    assert as_dict(pl_table) == as_dict(expected_table)
+    assert failed_list == expected_failed
+
+
+def test_cummulate_pairs_epsilon_and_multi_phone():
+    allowables = {'#': ['#'], 'x': ['k-s', 'k', '_epsilon_'],
+                  'e': ['iy', '_epsilon_'], 'a': ['ae']}
+    lexicon = {'axe': [('n', None, ['ae', 'k', 's'])],
+               'ex': [('n', None, ['iy', 'k', 's'])],
+               'xx': [('n', None, ['ae'])]}
+    pl_table, failed_list = cummulate_pairs(lexicon, allowables)
+    expected_table, expected_failed = enumerated_cummulate_pairs(lexicon,
+                                                                 allowables)
+    assert as_dict(pl_table) == as_dict(expected_table)
+    assert failed_list == expected_failed == [('xx', 'ae')]
+    assert pl_table['x']['k-s'] == 2.0
+    assert pl_table['e']['_epsilon_'] == pytest.approx(0.1)
+
+
+@pytest.mark.parametrize('value,score,count', [
+    (0.0, 0.1, 1),
+    (0.0, 0.1, 1000),
+    (0.3, 0.1, 12345),
+    (0.0, 1.0, 100000),
+    (2.0 ** 52, 1.0, 10),
+    (2.0 ** 53 - 8, 1.0, 20),
+    (1e16, 0.1, 50),
+    (7.5, 0.30000000000000004, 777),
+])
+def test_repeat_add_matches_loop(value, score, count):
+    expected = value
+    for _ in range(count):
+        expected += score
+    assert _repeat_add(value, score, count) == expected
+
+
+def test_repeat_add_random():
+    rng = random.Random(1)
+    for _ in range(200):
+        value = rng.choice([0.0, rng.random() * 10 ** rng.randint(0, 17)])
+        score = rng.choice([0.1, 1.0, rng.random()])
+        count = rng.randint(0, 3000)
+        expected = value
+        for _ in range(count):
+            expected += score
+        assert _repeat_add(value, score, count) == expected
+
+
+def test_repeat_add_zero_count():
+    assert _repeat_add(1.5, 0.1, 0) == 1.5
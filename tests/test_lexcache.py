@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+import os
+
+from pymimic.train_lex_lts import common, lexcache
+
+LEXICON = {
+    'hello': [('nil', [[['hh', 'ax'], 0], [['l', 'ow'], 1]],
+               ['hh', 'ax', 'l', 'ow1'])],
+    'read': [('v', [[['r', 'iy', 'd'], 1]], ['r', 'iy1', 'd']),
+             ('v', [[['r', 'eh', 'd'], 1]], ['r', 'eh1', 'd'])],
+    'flat': [('n', None, ['f', 'l', 'ae1', 't'])],
+    'ñandú': [(1, [], [])],
+}
+
+
+def test_round_trip(tmp_path):
+    key = b'k' * 20
+    assert lexcache.save(key, LEXICON, str(tmp_path))
+    assert dict(lexcache.load(key, str(tmp_path))) == LEXICON
+
+
+def test_missing_and_other_key(tmp_path):
+    assert lexcache.load(b'a' * 20, str(tmp_path)) is None
+    lexcache.save(b'a' * 20, LEXICON, str(tmp_path))
+    # A file renamed to another key is rejected
+    os.rename(lexcache.cache_file(b'a' * 20, str(tmp_path)),
+              lexcache.cache_file(b'b' * 20, str(tmp_path)))
+    assert lexcache.load(b'b' * 20, str(tmp_path)) is None
+
+
+def test_corrupt_cache(tmp_path):
+    key = b'c' * 20
+    lexcache.save(key, LEXICON, str(tmp_path))
+    filename = lexcache.cache_file(key, str(tmp_path))
+    with open(filename, 'r+b') as f:
+        f.truncate(60)
+    assert lexcache.load(key, str(tmp_path)) is None
+
+
+def test_uncacheable(tmp_path):
+    assert not lexcache.save(b'd' * 20, {'x': [('n', None, [('a',)])]},
+                             str(tmp_path))
+    assert not os.listdir(str(tmp_path))
+
+
+def test_key_depends_on_contents_and_options(tmp_path):
+    path = tmp_path / 'lex.scm'
+    path.write_text('("a" nil (((aa) 1)))\n')
+    key = lexcache.cache_key(str(path), False, [])
+    assert key == lexcache.cache_key(str(path), False, [])
+    assert key != lexcache.cache_key(str(path), True, [])
+    assert key != lexcache.cache_key(str(path), False, ['aa'])
+    path.write_text('("a" nil (((aa) 0)))\n')
+    assert key != lexcache.cache_key(str(path), False, [])
+
+
+def test_read_lexicon_uses_the_cache(tmp_path, monkeypatch):
+    monkeypatch.setenv('PYMIMIC_CACHE_DIR', str(tmp_path / 'cache'))
+    path = tmp_path / 'lex.scm'
+    path.write_text('("hello" nil (((hh ax) 0) ((l ow) 1)))\n')
+    parsed = common.read_lexicon(str(path), append_stress_to=['ow'],
+                                 workers=1, progress=False, cache=True)
+
+    def fail(*args):
+        raise AssertionError("parsed again")
+    monkeypatch.setattr(common, '_parse_lexicon', fail)
+    cached = common.read_lexicon(str(path), append_stress_to=['ow'],
+                                 workers=1, progress=False, cache=True)
+    assert dict(cached) == dict(parsed)
+
+
+def test_cache_is_opt_in(tmp_path, monkeypatch):
+    monkeypatch.setenv('PYMIMIC_CACHE_DIR', str(tmp_path / 'cache'))
+    monkeypatch.delenv('PYMIMIC_LEXICON_CACHE', raising=False)
+    path = tmp_path / 'lex.scm'
+    path.write_text('("hello" nil (((hh ax) 0) ((l ow) 1)))\n')
+    common.read_lexicon(str(path), workers=1, progress=False)
+    assert not (tmp_path / 'cache').exists()
+    monkeypatch.setenv('PYMIMIC_LEXICON_CACHE', '1')
+    common.read_lexicon(str(path), workers=1, progress=False)
+    assert len(os.listdir(lexcache.cache_dir())) == 1
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+import random
+
+import pytest
+
+from pymimic.train_lex_lts.common import predict_lex
+from pymimic.train_lex_lts.lexindex import LexiconIndex, write_index
+
+PHONES = ['aa', 'b', 'k', 'iy', 'l', 'ow', 's', 't']
+
+
+def random_lexicon(rng, num_words):
+    lexicon = {}
+    while len(lexicon) < num_words:
+        word = ''.join(rng.choice('abcñé') for _ in range(rng.randint(1, 6)))
+        entries = []
+        for _ in range(rng.randint(1, 2)):
+            syls = [[rng.sample(PHONES, rng.randint(1, 3)), rng.randint(0, 1)]
+                    for _ in range(rng.randint(1, 3))]
+            flat = [phone for syl in syls for phone in syl[0]]
+            entries.append((rng.choice(['n', 'v', 'nil']), syls, flat))
+        lexicon[word] = entries
+    return lexicon
+
+
+@pytest.fixture
+def lexicon():
+    return random_lexicon(random.Random(0), 500)
+
+
+@pytest.fixture
+def index(lexicon, tmp_path):
+    filename = str(tmp_path / 'lex.idx')
+    write_index(lexicon, filename)
+    with LexiconIndex(filename) as index:
+        yield index
+
+
+def test_lookups(lexicon, index):
+    assert len(index) == len(lexicon)
+    for word, entries in lexicon.items():
+        assert word in index
+        assert index[word] == entries
+    assert 'zzz' not in index
+    assert None not in index
+    with pytest.raises(KeyError):
+        index['zzz']
+    assert index.get('zzz') is None
+
+
+def test_sorted_iteration(lexicon, index):
+    expected = sorted(lexicon, key=lambda word: word.encode('utf-8'))
+    assert list(index) == expected
+    assert list(index.items()) == [(word, lexicon[word]) for word in expected]
+
+
+def test_usable_as_lexicon(lexicon, index):
+    word = sorted(lexicon)[0]
+    assert (predict_lex(word, lexicon=index) ==
+            predict_lex(word, lexicon=lexicon))
+
+
+def test_empty_lexicon(tmp_path):
+    filename = str(tmp_path / 'empty.idx')
+    write_index({}, filename)
+    with LexiconIndex(filename) as index:
+        assert len(index) == 0
+        assert 'a' not in index
+        assert list(index) == []
+
+
+def test_not_an_index(tmp_path):
+    filename = tmp_path / 'other.idx'
+    filename.write_bytes(b'x' * 64)
+    with pytest.raises(ValueError):
+        LexiconIndex(str(filename))
+
+
+def test_truncated_index(lexicon, tmp_path):
+    filename = str(tmp_path / 'lex.idx')
+    write_index(lexicon, filename)
+    with open(filename, 'r+b') as f:
+        f.truncate(f.seek(0, 2) - 1)
+    with pytest.raises(ValueError):
+        LexiconIndex(filename)
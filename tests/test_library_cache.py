@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import shutil
+
+from pymimic import pymimic
+
+
+def test_cached_path_is_absolute(fake_library, tmp_path, monkeypatch):
+    monkeypatch.setenv('PYMIMIC_CACHE_DIR', str(tmp_path / 'cache'))
+    libdir = tmp_path / 'lib'
+    libdir.mkdir()
+    shutil.copy(fake_library, str(libdir))
+    monkeypatch.chdir(str(libdir))
+    monkeypatch.setattr(pymimic, 'find_library', lambda name: None)
+    lib = pymimic._open_library('ttsmimiccore', ['.'])
+    expected = str(libdir / 'libttsmimiccore.so')
+    assert lib._name == expected
+    with open(pymimic._library_cache_file()) as f:
+        assert list(json.load(f).values()) == [expected]
+
+    # A cached file that is gone is searched for again
+    gone = str(tmp_path / 'gone' / 'libttsmimiccore.so')
+    pymimic._write_library_cache({key: gone for key in
+                                  pymimic._read_library_cache()})
+    lib = pymimic._open_library('ttsmimiccore', ['.'])
+    assert lib._name == expected
+    with open(pymimic._library_cache_file()) as f:
+        assert list(json.load(f).values()) == [expected]
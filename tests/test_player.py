@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+
+from pymimic import player
+from pymimic.player import Player, RingBuffer
+from pymimic.pymimic import SpeechChunk
+
+
+class RecordingSink():
+    """ Records the formats opened and bytes written, slowly """
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.events = []
+        self.writing = threading.Event()
+
+    def open(self, sample_rate, channels, sample_width):
+        self.events.append(('open', sample_rate, channels))
+
+    def write(self, data):
+        self.writing.set()
+        time.sleep(self.delay)
+        self.events.append(('write', bytes(data)))
+        self.writing.clear()
+
+    def close(self):
+        self.events.append(('close',))
+
+    def data(self):
+        return b''.join(e[1] for e in self.events if e[0] == 'write')
+
+
+def fake_synthesis(monkeypatch, chunks):
+    def synthesize_iter(text, voice):
+        return iter(chunks[text])
+    monkeypatch.setattr(player, 'synthesize_iter', synthesize_iter)
+
+
+def chunk(data, sample_rate=16000, channels=1):
+    return SpeechChunk('', data, [], sample_rate, channels, 0.0)
+
+
+def test_ring_buffer_wraps():
+    ring = RingBuffer(8)
+    ring.write(b'abcdef')
+    assert ring.read(4) == b'abcd'
+    ring.write(b'ghijk')
+    assert len(ring) == 7
+    # Reads stop at the end of the buffer
+    assert ring.read(8) == b'efgh'
+    assert ring.read(8) == b'ijk'
+    assert ring.read(8, timeout=0.01) == b''
+
+
+def test_wait_until_the_sink_has_written(monkeypatch):
+    fake_synthesis(monkeypatch, {'a': [chunk(b'\x01\x00' * 800)]})
+    sink = RecordingSink(delay=0.2)
+    with Player(None, sink, period_seconds=1.0) as p:
+        p.say('a')
+        # The single block is out of the ring and in the sink, wait()
+        # returns only after the sink is done with it
+        assert sink.writing.wait(5)
+        p.wait()
+        assert not sink.writing.is_set()
+        assert sink.data() == b'\x01\x00' * 800
+
+
+def test_sample_rate_change_reopens_the_sink(monkeypatch):
+    fake_synthesis(monkeypatch, {
+        'a': [chunk(b'\x01\x00' * 100), chunk(b'\x02\x00' * 100)],
+        'b': [chunk(b'\x03\x00' * 100, 8000)],
+        'c': [chunk(b'\x04\x00' * 100, 8000, 2)]})
+    sink = RecordingSink()
+    with Player(None, sink) as p:
+        for text in 'abc':
+            p.say(text)
+    assert p.error is None
+    opens = [e for e in sink.events if e[0] != 'write']
+    assert opens == [('open', 16000, 1), ('close',), ('open', 8000, 1),
+                     ('close',), ('open', 8000, 2), ('close',)]
+    # All audio of a format is written before its sink is closed
+    assert sink.events[sink.events.index(('close',)) - 1][1][-2:] == b'\x02\x00'
+    assert sink.data() == (b'\x01\x00' * 100 + b'\x02\x00' * 100 +
+                           b'\x03\x00' * 100 + b'\x04\x00' * 100)
+
+
+def test_speak_items(voice):
+    sink = RecordingSink()
+    with player.Speak('Hello.', voice) as speak:
+        expected = speak.bin()
+        with Player(voice, sink) as p:
+            p.say(speak)
+            p.say('Hello.')
+    assert p.items_synthesized == 2
+    assert sink.data() == expected * 2
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from pymimic.pool import (SharedVoicePool, ThreadPoolSynthesizer,
+                          synthesize_many)
+from pymimic.pymimic import Speak, live_objects
+from pymimic.registry import voice_registry
+from pymimic.shm import SharedChunk
+
+TEXTS = ['Hello world.', 'How are you?', 'Fine, thanks.', 'Bye.']
+
+
+@pytest.fixture
+def expected(voice):
+    result = []
+    for text in TEXTS:
+        with Speak(text, voice) as speak:
+            result.append(speak.bin())
+    return result
+
+
+def test_synthesize_many(expected):
+    chunks = list(synthesize_many(TEXTS, 'slt', workers=2, max_pending=1))
+    assert [chunk.data for chunk in chunks] == expected
+    assert [chunk.text for chunk in chunks] == TEXTS
+
+
+def test_synthesize_many_shared_memory(expected):
+    data = []
+    for chunk in synthesize_many(TEXTS, 'slt', workers=2,
+                                 shared_memory=True):
+        assert isinstance(chunk, SharedChunk)
+        data.append(chunk.bin())
+        chunk.release()
+    assert data == expected
+
+
+def test_worker_error(fake_library):
+    with pytest.raises(ValueError):
+        list(synthesize_many(TEXTS, 'missing', workers=1))
+
+
+def test_thread_pool(expected):
+    with ThreadPoolSynthesizer('slt', workers=2) as pool:
+        assert 'slt' in voice_registry
+        chunks = list(pool.map(TEXTS, max_pending=2))
+        assert pool.submit(TEXTS[0]).result().data == expected[0]
+    assert [chunk.data for chunk in chunks] == expected
+
+
+def test_shared_voice_pool(expected):
+    utterances = live_objects().get('utterances', 0)
+    with SharedVoicePool(['slt', 'kal'], workers=2,
+                         shared_memory=True) as pool:
+        data = []
+        for chunk in pool.map(TEXTS):
+            data.append(chunk.bin())
+            chunk.release()
+        assert data == expected
+        ref = pool.submit(TEXTS[0], voice='kal').get()
+        # Not opened, freed through the reference
+        ref.release()
+        with pytest.raises(ValueError):
+            pool.submit(TEXTS[0], voice='awb')
+        usage = pool.memory_usage()
+        assert len(usage['workers']) == 2
+    assert live_objects().get('utterances', 0) == utterances
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+from collections import defaultdict
+import random
+
+import pytest
+
+from pymimic.train_lex_lts import common
+from pymimic.train_lex_lts.common import (
+    flatten_syls, lexicon_shards, read_lexicon, read_raw_lexicon)
+
+PHONES = ['aa', 'b', 'k', 'iy', 'l', 'ow', 's', 't']
+
+
+def write_lexicon(path, rng, num_entries, header=True):
+    lines = ['MNCL'] if header else []
+    for i in range(num_entries):
+        # Repeated words get several entries, in file order
+        word = 'w{}'.format(rng.randint(0, num_entries // 2))
+        syls = ' '.join(
+            '(({}) {})'.format(' '.join(rng.sample(PHONES, rng.randint(1, 3))),
+                               rng.randint(0, 1))
+            for _ in range(rng.randint(1, 3)))
+        lines.append('("{}" {} ({}))'.format(word, rng.choice(['n', 'v', 'nil']),
+                                             syls))
+        if rng.random() < 0.1:
+            lines.append('')
+    path.write_text('\n'.join(lines) + '\n')
+
+
+def expected_lexicon(path, append_stress_to):
+    output = defaultdict(list)
+    for word, pos, syls in read_raw_lexicon(str(path)):
+        output[word].append((pos, syls, flatten_syls(syls, append_stress_to)))
+    return dict(output)
+
+
+def test_lexicon_shards_cover_the_file(tmp_path):
+    path = tmp_path / 'lex.scm'
+    path.write_bytes(b'x' * 1000)
+    shards = lexicon_shards(str(path), 7)
+    assert len(shards) == 7
+    assert shards[0][0] == 0 and shards[-1][1] == 1000
+    assert all(a[1] == b[0] for a, b in zip(shards, shards[1:]))
+    assert lexicon_shards(str(path), 5000)[-1] == (999, 1000)
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+@pytest.mark.parametrize('header', [True, False])
+def test_sharded_read_matches_line_by_line(tmp_path, monkeypatch, workers,
+                                           header):
+    path = tmp_path / 'lex.scm'
+    write_lexicon(path, random.Random(workers), 300, header)
+    # Many small shards, cut in the middle of lines
+    monkeypatch.setattr(common, 'MIN_SHARD_BYTES', 97)
+    lexicon = read_lexicon(str(path), append_stress_to=['aa', 'iy', 'ow'],
+                           workers=workers, progress=False, cache=False)
+    assert dict(lexicon) == expected_lexicon(path, ['aa', 'iy', 'ow'])
+
+
+def test_flat_lexicon(tmp_path):
+    path = tmp_path / 'lex.scm'
+    path.write_text('("abc" nil (aa1 b k))\n("abc" n (aa0 b))\n')
+    lexicon = read_lexicon(str(path), is_flat=True, workers=1,
+                           progress=False, cache=False)
+    assert dict(lexicon) == {'abc': [('nil', None, ['aa1', 'b', 'k']),
+                                     ('n', None, ['aa0', 'b'])]}
+
+
+def test_malformed_line(tmp_path):
+    path = tmp_path / 'lex.scm'
+    path.write_text('("abc")\n')
+    with pytest.raises(ValueError):
+        read_lexicon(str(path), workers=1, progress=False, cache=False)
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from pymimic.pymimic import Speak, Voice
+from pymimic.registry import VoiceRegistry
+
+
+@pytest.fixture
+def registry(fake_library):
+    registry = VoiceRegistry(max_voices=2)
+    yield registry
+    registry.clear()
+
+
+def test_acquire_shares_the_voice(registry):
+    first = registry.acquire('slt')
+    second = registry.acquire('slt')
+    assert first is second
+    assert (registry.loads, registry.hits) == (1, 1)
+    registry.release(first)
+    registry.release(second)
+    with pytest.raises(ValueError):
+        registry.release(first)
+    with pytest.raises(ValueError):
+        registry.release(Voice('slt'))
+
+
+def test_unknown_voice(registry):
+    with pytest.raises(ValueError):
+        registry.acquire('missing')
+    assert len(registry) == 0
+
+
+def test_evicts_unused_voices_first(registry):
+    with registry.voice('slt') as slt:
+        registry.preload(['kal', 'awb'])
+        # kal was the least recently used voice not in use
+        assert 'slt' in registry and 'awb' in registry
+        assert 'kal' not in registry
+        assert registry.evictions == 1
+        with registry.voice('kal'), registry.voice('rms'):
+            # Everything in use, over the limit until released
+            assert len(registry) == 3
+        assert len(registry) == 2
+        assert 'slt' in registry
+        with Speak('Hello.', slt) as speak:
+            assert speak.num_samples
+
+
+def test_evicted_voice_loads_again(registry):
+    with registry.voice('slt') as slt:
+        with Speak('Hello.', slt) as speak:
+            expected = speak.bin()
+    registry.clear()
+    assert 'slt' not in registry
+    # The library still has the native voice, the new wrapper works
+    with registry.voice('slt') as slt:
+        with Speak('Hello.', slt) as speak:
+            assert speak.bin() == expected
+    assert registry.loads == 2
+
+
+def test_voice_path_key(registry, tmp_path):
+    path = tmp_path / 'voice.flitevox'
+    path.write_bytes(b'x' * 100)
+    with registry.voice(str(path)):
+        assert registry.total_bytes == 100
+        assert str(path) in registry
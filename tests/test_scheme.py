@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+import re
+import sys
+
+import pytest
+
+from pymimic.train_lex_lts.scheme import (
+    parse, read, read_forms, read_from_tokens, tokenize)
+
+
+def test_parse_lexicon_entry():
+    assert parse('("hello" nil (((hh ax) 0) ((l ow) 1)))') == \
+        ['hello', 'nil', [[['hh', 'ax'], 0], [['l', 'ow'], 1]]]
+
+
+def test_atoms():
+    assert parse('(1 -2 1.5 nil "7")') == [1, -2, 1.5, 'nil', '7']
+    assert parse('x') == 'x'
+
+
+def test_quoted_strings_keep_spaces_and_parentheses():
+    assert parse('("a b (c)" d)') == ['a b (c)', 'd']
+
+
+def test_quote_inside_token():
+    assert parse('(x"y z)') == ['x"y', 'z']
+
+
+def test_read_from_tokens():
+    assert read_from_tokens(tokenize('(a (b c)) (d)'), 'utf-8') == \
+        ['a', ['b', 'c']]
+
+
+def test_read_forms_across_lines():
+    lines = ['(a\n', ' b) (c', ')\n', 'd\n']
+    assert list(read_forms(lines)) == [['a', 'b'], ['c'], 'd']
+    assert read(lines) == ['a', 'b']
+
+
+def test_deep_nesting_does_not_recurse():
+    depth = sys.getrecursionlimit() * 2
+    form = parse('(' * depth + 'x' + ')' * depth)
+    for _ in range(depth):
+        assert len(form) == 1
+        form = form[0]
+    assert form == 'x'
+
+
+@pytest.mark.parametrize('text,message', [
+    ('(a (b)', 'unexpected EOF while reading'),
+    (')', 'unexpected )'),
+    ('', 'unexpected EOF while reading'),
+])
+def test_syntax_errors(text, message):
+    with pytest.raises(SyntaxError, match=re.escape(message)):
+        parse(text)
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+import io
+import json
+import threading
+import wave
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+import pytest
+
+from pymimic.pymimic import Speak
+from pymimic.server import SynthesisService, make_server
+
+
+@pytest.fixture
+def service(fake_library):
+    service = SynthesisService(['slt', 'kal'], workers=2)
+    yield service
+    service.close()
+
+
+def test_synthesize(service, voice):
+    chunks = list(service.synthesize('Hello world. How are you?'))
+    assert [chunk.text for chunk in chunks] == ['Hello world.', 'How are you?']
+    for chunk in chunks:
+        with Speak(chunk.text, voice) as speak:
+            assert chunk.data == speak.bin()
+    assert service.syntheses == 2
+    assert service.request_latency.count == 1
+    with pytest.raises(ValueError):
+        next(service.synthesize('Hello.', 'awb'))
+
+
+def test_identical_sentences_are_coalesced(service):
+    # Submitted back to back, the first is still in flight for the others
+    chunks = list(service.synthesize('Hello there. ' * 5))
+    assert len(chunks) == 5
+    assert len(set(chunk.data for chunk in chunks)) == 1
+    assert service.coalesced > 0
+    assert service.syntheses + service.coalesced == 5
+    # Another voice is not the same synthesis
+    first = service.submit('Hello there.', 'slt')
+    other = service.submit('Hello there.', 'kal')
+    assert first is not other
+    first.get()
+    other.get()
+    assert not service._inflight
+
+
+def test_metrics_text(service):
+    list(service.synthesize('Hello.'))
+    text = service.metrics_text()
+    assert 'pymimic_server_syntheses_total 1\n' in text
+    assert 'pymimic_server_request_seconds_count 1\n' in text
+    assert 'pymimic_server_first_chunk_seconds_bucket{le="+Inf"} 1\n' in text
+
+
+def test_http(service, voice):
+    server = make_server(service, port=0)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+    try:
+        url = 'http://127.0.0.1:{}'.format(server.server_port)
+        body = json.dumps({'text': 'Hello world.'}).encode('utf-8')
+        with urlopen(Request(url + '/synthesize', body)) as response:
+            assert response.headers['X-Sample-Rate'] == '16000'
+            data = response.read()
+        with wave.open(io.BytesIO(data)) as w:
+            frames = w.readframes(w.getnframes())
+        with Speak('Hello world.', voice) as speak:
+            assert frames == speak.bin()
+        with urlopen(url + '/health') as response:
+            assert response.read() == b'ok\n'
+        bad = json.dumps({'text': 'Hi.', 'voice': 'awb'}).encode('utf-8')
+        with pytest.raises(HTTPError) as error:
+            urlopen(Request(url + '/synthesize', bad))
+        assert error.value.code == 400
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join()
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+import gc
+
+import pytest
+
+from pymimic.pymimic import Speak, live_objects
+
+TEXT = 'Hello world.'
+
+
+def live(kind):
+    return live_objects().get(kind, 0)
+
+
+@pytest.mark.parametrize('keep', ['utterance', 'wave', 'pcm'])
+def test_keep_modes(voice, keep):
+    utterances, waves = live('utterances'), live('waves')
+    with Speak(TEXT, voice, keep=keep) as speak:
+        assert speak.num_samples > 0
+        data = speak.bin()
+        assert len(data) == 2 * speak.num_samples
+        assert speak.buffer().tobytes() == data
+        assert speak[:4] == data[:4]
+        if keep == 'utterance':
+            assert speak.phonemes
+            assert live('utterances') == utterances + 1
+        else:
+            with pytest.raises(ValueError):
+                speak.phonemes
+            assert live('utterances') == utterances
+        assert live('waves') == waves + (keep == 'wave')
+        if keep == 'pcm':
+            with pytest.raises(ValueError):
+                speak.samples
+    assert live('utterances') == utterances
+    assert live('waves') == waves
+    assert speak.bin() == data
+
+
+@pytest.mark.parametrize('keep', ['utterance', 'wave'])
+def test_close_with_live_views(voice, keep):
+    kind = 'utterances' if keep == 'utterance' else 'waves'
+    before = live(kind)
+    speak = Speak(TEXT, voice, keep=keep)
+    data = speak.bin()
+    first = speak.buffer()
+    second = speak.buffer()[10:]
+    speak.close()
+    # The native memory stays until the last view is gone
+    assert live(kind) == before + 1
+    assert first.tobytes() == data
+    del first
+    gc.collect()
+    assert live(kind) == before + 1
+    assert second.tobytes() == data[10:]
+    del second
+    assert live(kind) == before
+    # Only the copy made by bin() is left
+    assert speak.buffer().tobytes() == data
+    with pytest.raises(ValueError):
+        speak.samples
+
+
+def test_views_released_before_close(voice):
+    before = live('utterances')
+    speak = Speak(TEXT, voice)
+    speak.buffer()
+    speak.buffer()
+    speak.close()
+    assert live('utterances') == before
+
+
+def test_close_with_live_array(voice):
+    numpy = pytest.importorskip('numpy')
+    before = live('utterances')
+    speak = Speak(TEXT, voice)
+    samples = speak.array()
+    data = speak.bin()
+    speak.close()
+    assert live('utterances') == before + 1
+    assert samples.tobytes() == data
+    assert numpy.abs(samples).max() > 0
+    del samples
+    assert live('utterances') == before
+
+
+def test_pcm_views_need_no_native_memory(voice):
+    speak = Speak(TEXT, voice, keep='pcm')
+    view = speak.buffer()
+    speak.close()
+    assert view.tobytes() == speak.bin()
+
+
+def test_wave_conversions(voice):
+    with Speak(TEXT, voice) as speak:
+        wave = speak.mimic_wave.contents
+        assert bytes(wave) == speak.bin()
+        assert isinstance(str(wave), str)
+
+
+def test_stream_chunks(voice):
+    utterances = live('utterances')
+    chunks = list(Speak.stream('Hello world. How are you? Fine', voice))
+    assert [chunk.text for chunk in chunks] == ['Hello world.',
+                                                'How are you?', 'Fine']
+    start = 0.0
+    for chunk in chunks:
+        with Speak(chunk.text, voice) as speak:
+            assert chunk.data == speak.bin()
+        assert chunk.start == pytest.approx(start)
+        start += chunk.duration
+    # Every utterance is freed before its chunk is yielded
+    assert live('utterances') == utterances
+
+
+def test_stream_output_format(voice):
+    pytest.importorskip('numpy')
+    from pymimic.audio import OutputFormat
+    text = 'Hello world. How are you?'
+    chunks = list(Speak.stream(text, voice,
+                               output_format=OutputFormat(8000, 'float32')))
+    assert all(chunk.sample_rate == 8000 and chunk.encoding == 'float32'
+               for chunk in chunks)
+    # The resampler's tail comes last, without text
+    assert chunks[-1].text == ''
+    samples = sum(len(Speak(c.text, voice, keep='pcm').bin()) // 2
+                  for c in chunks[:-1])
+    assert sum(len(c.data) for c in chunks) == 4 * -(-samples // 2)